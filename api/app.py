@@ -3,12 +3,27 @@ Flask API Backend for Agricultural Market Dashboard
 Provides REST API endpoints for market data, commodities, and price forecasts
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, g, has_request_context, Response
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import pandas as pd
+import numpy as np
 import sqlite3
 from datetime import datetime
+from collections import OrderedDict
+from contextlib import contextmanager
 import os
+import json
+import base64
+import gzip
+import hashlib
+import hmac
+import math
+import random
+import sys
+import threading
+import time
+import warnings
 import requests
 from io import BytesIO
 import tempfile
@@ -20,6 +35,15 @@ CORS(app)  # Enable CORS for React frontend
 df = None
 predictions_df = None
 MODEL_COMMODITIES = []
+DATA_VERSION = ''
+PREDICTIONS_VERSION = ''
+FORECAST_SERIES = {}
+
+# Central prediction-interval coverages served by /api/forecast-uncertainty
+INTERVAL_LEVELS = (0.5, 0.8, 0.95)
+DEFAULT_INTERVAL_LEVEL = 0.8
+# A series needs this many forecast/actual pairs before its own residuals are trusted
+MIN_BACKTEST_RESIDUALS = 10
 
 # Get database URLs from environment variables (Dropbox links)
 DATA_DB_URL = os.environ.get('DATABASE_URL', '')
@@ -125,10 +149,16 @@ def get_predictions_data():
         
         query = "SELECT ds, Market, Commodity, Predicted_Price, trend, season_yearly, season_weekly FROM predicted_prices"
         df = pd.read_sql_query(query, conn)
+        try:
+            intervals = pd.read_sql_query(
+                "SELECT Market, Commodity, level, lower, upper, residuals FROM forecast_intervals", conn)
+        except pd.errors.DatabaseError:
+            # Written by predict_store.py; older prediction databases do not have it
+            intervals = pd.DataFrame(columns=['Market', 'Commodity', 'level', 'lower', 'upper', 'residuals'])
         conn.close()
         print(f"Loaded {len(df)} records from predictions data")
         df['ds'] = pd.to_datetime(df['ds'])
-        return df
+        return df, intervals
     except Exception as e:
         print(f"Error loading predictions data: {e}")
         import traceback
@@ -136,6 +166,78 @@ def get_predictions_data():
         raise
 
 
+def build_forecast_series(predictions, history, stored_intervals):
+    """Per-(Market, Commodity) forecast arrays with empirical prediction bands.
+
+    Bands come from relative residuals (actual / predicted - 1) wherever predicted_prices
+    overlaps observed daily Modal_Price. Series with too little overlap fall back to the
+    backtest quantiles stored by predict_store.py, then to residuals pooled across all
+    series, and only then to the old fixed +/-10%.
+    """
+    preds = predictions.dropna(subset=['ds', 'Predicted_Price']).sort_values(['Market', 'Commodity', 'ds'])
+    preds = preds.assign(day=preds['ds'].dt.normalize())
+
+    residuals = pd.DataFrame({'Market': pd.Series(dtype=object), 'Commodity': pd.Series(dtype=object),
+                              'residual': pd.Series(dtype=np.float64)})
+    if not history.empty:
+        actual = (history.assign(day=history['Arrival_Date'].dt.normalize())
+                  .groupby(['Market', 'Commodity', 'day'])['Modal_Price'].mean().rename('actual').reset_index())
+        overlap = preds.merge(actual, on=['Market', 'Commodity', 'day'])
+        overlap = overlap[overlap['Predicted_Price'] > 0]
+        residuals = overlap.assign(residual=overlap['actual'] / overlap['Predicted_Price'] - 1.0)
+
+    counts, series_bands, pooled_bands = {}, {}, {}
+    if not residuals.empty:
+        by_series = residuals.groupby(['Market', 'Commodity'])['residual']
+        counts = by_series.size().to_dict()
+        series_bands = {level: (by_series.quantile((1 - level) / 2).to_dict(),
+                                by_series.quantile(1 - (1 - level) / 2).to_dict())
+                        for level in INTERVAL_LEVELS}
+        pooled_bands = {level: (residuals['residual'].quantile((1 - level) / 2),
+                                residuals['residual'].quantile(1 - (1 - level) / 2))
+                        for level in INTERVAL_LEVELS}
+
+    stored = {}
+    for row in stored_intervals.itertuples(index=False):
+        stored.setdefault((row.Market, row.Commodity), {})[round(float(row.level), 4)] = (
+            float(row.lower), float(row.upper), int(row.residuals))
+
+    result = {}
+    for key, group in preds.groupby(['Market', 'Commodity'], sort=False):
+        if counts.get(key, 0) >= MIN_BACKTEST_RESIDUALS:
+            method, n = 'backtest', counts[key]
+            bands = {level: (series_bands[level][0][key], series_bands[level][1][key]) for level in INTERVAL_LEVELS}
+        elif all(level in stored.get(key, {}) for level in INTERVAL_LEVELS):
+            method, n = 'refresh-backtest', stored[key][INTERVAL_LEVELS[0]][2]
+            bands = {level: stored[key][level][:2] for level in INTERVAL_LEVELS}
+        elif len(residuals) >= MIN_BACKTEST_RESIDUALS:
+            method, n = 'pooled', len(residuals)
+            bands = pooled_bands
+        else:
+            method, n = 'fixed', 0
+            bands = {level: (-0.1, 0.1) for level in INTERVAL_LEVELS}
+
+        predicted = group['Predicted_Price'].to_numpy(dtype=np.float64)
+        result[key] = {
+            'dates': group['ds'].dt.strftime('%Y-%m-%d').tolist(),
+            'predicted': np.round(predicted, 2).tolist(),
+            'method': method,
+            'residuals': int(n),
+            'bands': {level: (np.round(predicted * (1 + lower), 2).tolist(),
+                              np.round(predicted * (1 + upper), 2).tolist())
+                      for level, (lower, upper) in bands.items()}
+        }
+    return result
+
+
+def compute_data_version(data):
+    """Short content hash of a loaded table; derived caches are keyed on the market data's"""
+    if data.empty:
+        return 'empty'
+    digest = hashlib.sha1(pd.util.hash_pandas_object(data, index=False).values.tobytes())
+    return digest.hexdigest()[:12]
+
+
 # Initialize data on startup
 try:
     df = get_data()
@@ -143,50 +245,1266 @@ try:
 except Exception as e:
     print(f"✗ ERROR loading market data: {e}")
     df = pd.DataFrame()
+DATA_VERSION = compute_data_version(df)
 
 try:
-    predictions_df = get_predictions_data()
+    predictions_df, stored_intervals = get_predictions_data()
     MODEL_COMMODITIES = sorted(predictions_df['Commodity'].unique().tolist())
     print(f"✓ Predictions loaded successfully: {len(MODEL_COMMODITIES)} commodities")
 except Exception as e:
     print(f"✗ ERROR loading predictions: {e}")
-    print("  Run predict_store.py to generate predictions")
+    print("  Run python api/predict_store.py to generate predictions")
     predictions_df = pd.DataFrame()
     MODEL_COMMODITIES = []
+PREDICTIONS_VERSION = compute_data_version(predictions_df)
 
+if not predictions_df.empty:
+    try:
+        FORECAST_SERIES = build_forecast_series(predictions_df, df, stored_intervals)
+        print(f"✓ Prediction intervals built for {len(FORECAST_SERIES)} series")
+    except Exception as e:
+        print(f"✗ ERROR building prediction intervals: {e}")
+        FORECAST_SERIES = {}
 
-def apply_filters(data):
-    """Apply filters from request parameters to dataframe"""
-    filtered_df = data.copy()
+
+# ============================================================
+# REQUEST INSTRUMENTATION
+# ============================================================
+
+# Requests slower than this are printed to the slow-request log
+SLOW_REQUEST_MS = float(os.environ.get('SLOW_REQUEST_MS', '1000'))
+# JSON responses smaller than this are not worth gzipping
+GZIP_MIN_BYTES = int(os.environ.get('GZIP_MIN_BYTES', '1024'))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+PHASES = ('filter', 'aggregate', 'serialise', 'compress')
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label tuple, rendered in Prometheus text format"""
+
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self.lock:
+            entry = self.series.get(labels)
+            if entry is None:
+                entry = self.series[labels] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['counts'][i] += 1
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self.lock:
+            for labels, entry in sorted(self.series.items()):
+                base = format_labels(self.label_names, labels)
+                for bound, count in zip(self.buckets, entry['counts']):
+                    lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {entry["count"]}')
+                lines.append(f'{self.name}_sum{{{base}}} {entry["sum"]:.6f}')
+                lines.append(f'{self.name}_count{{{base}}} {entry["count"]}')
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by label tuple, rendered in Prometheus text format"""
+
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self.lock:
+            self.series[labels] = self.series.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self.lock:
+            for labels, value in sorted(self.series.items()):
+                lines.append(f'{self.name}{{{format_labels(self.label_names, labels)}}} {value}')
+        return lines
+
+
+def format_labels(names, values):
+    """Render a Prometheus label set, escaping backslashes, quotes and newlines"""
+    parts = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{escaped}"')
+    return ','.join(parts)
+
+
+REQUEST_LATENCY = Histogram('agrimarket_request_duration_seconds', 'End-to-end request latency',
+                            LATENCY_BUCKETS, ('endpoint',))
+PHASE_LATENCY = Histogram('agrimarket_request_phase_seconds', 'Time spent in each request phase',
+                          LATENCY_BUCKETS, ('endpoint', 'phase'))
+RESPONSE_BYTES = Histogram('agrimarket_response_bytes', 'Response body size as sent',
+                           SIZE_BUCKETS, ('endpoint',))
+REQUESTS_TOTAL = Counter('agrimarket_requests_total', 'Requests handled', ('endpoint', 'status'))
+ROWS_SCANNED = Counter('agrimarket_rows_scanned_total', 'Rows read by apply_filters', ('endpoint',))
+ROWS_RETURNED = Counter('agrimarket_rows_returned_total', 'Rows left after apply_filters', ('endpoint',))
+CACHE_REQUESTS = Counter('agrimarket_cache_requests_total', 'Cache lookups by outcome', ('cache', 'result'))
+SLOW_REQUESTS = Counter('agrimarket_slow_requests_total', 'Requests slower than SLOW_REQUEST_MS', ('endpoint',))
+SINGLE_FLIGHT = Counter('agrimarket_single_flight_total',
+                        'Coalesced computations by role (leader computed, follower shared)', ('endpoint', 'role'))
+
+METRICS = [REQUEST_LATENCY, PHASE_LATENCY, RESPONSE_BYTES, REQUESTS_TOTAL,
+           ROWS_SCANNED, ROWS_RETURNED, CACHE_REQUESTS, SLOW_REQUESTS, SINGLE_FLIGHT]
+
+
+def current_endpoint():
+    """Route template for the active request, so path parameters do not explode label cardinality"""
+    if request.url_rule is not None:
+        return request.url_rule.rule
+    return 'unmatched'
+
+
+def normalize_query_args(args):
+    """Canonical (key, sorted values) tuple for a request's query string, independent of parameter order.
+
+    Double-underscore control parameters (profiling flags, tokens) are left out.
+    """
+    return tuple(sorted((key, tuple(sorted(args.getlist(key))))
+                        for key in args.keys() if not key.startswith('__')))
+
+
+@contextmanager
+def timed_phase(name):
+    """Accumulate wall time spent in the block under the named phase of the current request"""
+    if not has_request_context() or 'phases' not in g:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.phases[name] = g.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def record_cache_lookup(cache, hit):
+    """Count a cache hit or miss; hit ratios are derived from these counters"""
+    CACHE_REQUESTS.inc((cache, 'hit' if hit else 'miss'))
+
+
+def record_rows(scanned, returned):
+    """Count rows read and kept by the current request's filters"""
+    if not has_request_context() or 'phases' not in g:
+        return
+    endpoint = current_endpoint()
+    ROWS_SCANNED.inc((endpoint,), scanned)
+    ROWS_RETURNED.inc((endpoint,), returned)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that books encoding time against the serialise phase"""
+
+    def dumps(self, obj, **kwargs):
+        with timed_phase('serialise'):
+            return super().dumps(obj, **kwargs)
+
+
+app.json = TimedJSONProvider(app)
+
+
+def compress_response(response):
+    """Gzip large JSON bodies for clients that accept it"""
+    if response.direct_passthrough or response.is_streamed or response.status_code != 200:
+        return
+    if response.mimetype != 'application/json' or 'Content-Encoding' in response.headers:
+        return
+    if 'gzip' not in request.headers.get('Accept-Encoding', ''):
+        return
+    body = response.get_data()
+    if len(body) < GZIP_MIN_BYTES:
+        return
+    with timed_phase('compress'):
+        response.set_data(gzip.compress(body, compresslevel=5))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    g.phases = {}
+
+
+@app.after_request
+def finish_request_timer(response):
+    if 'request_start' not in g:
+        return response
+    compress_response(response)
+
+    endpoint = current_endpoint()
+    total = time.perf_counter() - g.request_start
+    phases = dict(g.phases)
+    # Whatever the handler spent outside filtering, encoding and compression is grouping/aggregation
+    phases['aggregate'] = max(total - sum(phases.values()), 0.0)
+
+    REQUEST_LATENCY.observe((endpoint,), total)
+    REQUESTS_TOTAL.inc((endpoint, str(response.status_code)))
+    for phase in PHASES:
+        if phase in phases:
+            PHASE_LATENCY.observe((endpoint, phase), phases[phase])
+    if not response.is_streamed:
+        RESPONSE_BYTES.observe((endpoint,), response.calculate_content_length() or 0)
+
+    timings = [f'{phase};dur={phases[phase] * 1000:.2f}' for phase in PHASES if phase in phases]
+    timings.append(f'total;dur={total * 1000:.2f}')
+    response.headers['Server-Timing'] = ', '.join(timings)
+
+    if total * 1000 >= SLOW_REQUEST_MS:
+        SLOW_REQUESTS.inc((endpoint,))
+        print('SLOW REQUEST ' + json.dumps({
+            'endpoint': endpoint,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'phases_ms': {phase: round(value * 1000, 2) for phase, value in phases.items()},
+            'query': {key: list(values) for key, values in normalize_query_args(request.args)}
+        }))
+    return response
+
+
+# ============================================================
+# ON-DEMAND PROFILING
+# ============================================================
+
+# Profiling is off unless one of these is set; when off, each request pays a single boolean check
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILING_ENABLED = os.environ.get('ENABLE_PROFILING', '') == '1'
+# Fraction of ordinary traffic sampled continuously into the per-endpoint aggregate
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '2'))
+PROFILING_AVAILABLE = bool(PROFILE_TOKEN or PROFILING_ENABLED or PROFILE_SAMPLE_RATE > 0)
+
+PROFILE_AGGREGATE = {}
+PROFILE_AGGREGATE_LOCK = threading.Lock()
+APP_FILE = os.path.abspath(__file__)
+
+
+class StackSampler:
+    """Background thread that periodically captures the call stack of one request thread"""
+
+    def __init__(self, thread_id, interval_ms=PROFILE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000.0
+        self.stacks = {}
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or self.stopped.is_set():
+                # A frame captured after stop() is just the request thread waiting on us
+                continue
+            stack = collapse_stack(frame)
+            if stack:
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+                self.samples += 1
+
+
+def collapse_stack(frame):
+    """Render a frame chain as a root-first `a;b;c` string, starting at the first frame in this module"""
+    names = []
+    start = None
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get('__name__', '?')
+        names.append(f'{module}:{getattr(code, "co_qualname", code.co_name)}')
+        if os.path.abspath(code.co_filename) == APP_FILE:
+            # Everything above the outermost app frame is Flask/Werkzeug dispatch
+            start = len(names)
+        frame = frame.f_back
+    if start is not None:
+        names = names[:start]
+    return ';'.join(reversed(names))
+
+
+def build_call_tree(stacks):
+    """Fold collapsed stacks into a nested {name, value, children} tree (d3-flame-graph format)"""
+    root = {'name': 'root', 'value': 0, 'children': {}}
+    for stack, count in stacks.items():
+        root['value'] += count
+        node = root
+        for name in stack.split(';'):
+            child = node['children'].get(name)
+            if child is None:
+                child = node['children'][name] = {'name': name, 'value': 0, 'children': {}}
+            child['value'] += count
+            node = child
+
+    def finalize(node):
+        children = sorted(node['children'].values(), key=lambda c: -c['value'])
+        return {'name': node['name'], 'value': node['value'], 'children': [finalize(c) for c in children]}
+
+    return finalize(root)
+
+
+def hottest_stacks(stacks, limit=20):
+    """Most frequently sampled stacks, highest first"""
+    ranked = sorted(stacks.items(), key=lambda item: -item[1])[:limit]
+    return [{'stack': stack, 'samples': count} for stack, count in ranked]
+
+
+def profiling_authorised():
+    """A profile may be requested with the admin token, or by anyone when ENABLE_PROFILING=1"""
+    if PROFILE_TOKEN:
+        supplied = request.headers.get('X-Profile-Token') or request.args.get('__token', '')
+        return hmac.compare_digest(supplied.encode('utf-8'), PROFILE_TOKEN.encode('utf-8'))
+    return PROFILING_ENABLED
+
+
+@app.before_request
+def start_profiler():
+    if not PROFILING_AVAILABLE:
+        return
+    if request.args.get('__profile') == '1':
+        if not profiling_authorised():
+            return jsonify({'error': 'Profiling not authorised'}), 403
+        g.profile_mode = 'report'
+    elif PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        g.profile_mode = 'sample'
+    else:
+        return
+    g.profile_started = time.perf_counter()
+    g.profiler = StackSampler(threading.get_ident()).start()
+
+
+@app.after_request
+def finish_profiler(response):
+    if 'profiler' not in g:
+        return response
+    stacks = g.profiler.stop()
+    elapsed_ms = (time.perf_counter() - g.profile_started) * 1000
+    endpoint = current_endpoint()
+
+    with PROFILE_AGGREGATE_LOCK:
+        aggregate = PROFILE_AGGREGATE.setdefault(endpoint, {'requests': 0, 'stacks': {}})
+        aggregate['requests'] += 1
+        for stack, count in stacks.items():
+            aggregate['stacks'][stack] = aggregate['stacks'].get(stack, 0) + count
+
+    if g.profile_mode != 'report':
+        return response
+
+    if request.args.get('__profile_format') == 'collapsed':
+        # Feed straight into flamegraph.pl / speedscope
+        body = '\n'.join(f'{stack} {count}' for stack, count in sorted(stacks.items()))
+        return Response(body + '\n', content_type='text/plain; charset=utf-8')
+
+    return jsonify({
+        'endpoint': endpoint,
+        'path': request.path,
+        'status': response.status_code,
+        'elapsed_ms': round(elapsed_ms, 2),
+        'interval_ms': PROFILE_INTERVAL_MS,
+        'samples': sum(stacks.values()),
+        'hottest': hottest_stacks(stacks),
+        'tree': build_call_tree(stacks)
+    })
+
+
+# ============================================================
+# CANCELLATION
+# ============================================================
+
+# WSGI environ key under which the ASGI front-end (asgi.py) passes a threading.Event
+# that is set once the client disconnects or the request deadline passes
+CANCEL_EVENT_KEY = 'agrimarket.cancelled'
+
+
+class RequestCancelled(Exception):
+    """Raised inside a handler whose result nobody is waiting for any more"""
+
+
+def request_cancelled():
+    """True if the serving layer has abandoned the current request"""
+    if not has_request_context():
+        return False
+    event = request.environ.get(CANCEL_EVENT_KEY)
+    return event is not None and event.is_set()
+
+
+def check_cancelled():
+    """Stop an abandoned request before it starts another expensive step"""
+    if request_cancelled():
+        raise RequestCancelled()
+
+
+# ============================================================
+# SINGLE-FLIGHT REQUEST COALESCING
+# ============================================================
+
+class SingleFlight:
+    """Run one computation per key at a time; concurrent callers with the same key share its result"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+
+    def do(self, key, compute):
+        """Return (result, shared) where shared is True if another caller did the work"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = {'done': threading.Event(), 'result': None, 'error': None}
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], True
+
+        try:
+            call['result'] = compute()
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call['done'].set()
+        return call['result'], False
+
+    def in_flight(self):
+        with self.lock:
+            return len(self.calls)
+
+
+single_flight = SingleFlight()
+
+
+def coalesced(compute):
+    """Compute a JSON payload for the current request, sharing it with identical concurrent requests.
+
+    The key covers the route, path parameters and normalised query string, so only requests
+    that would produce byte-identical answers are merged. Only the payload is shared; each
+    request still builds its own Response.
+    """
+    endpoint = current_endpoint()
+    key = (endpoint, tuple(sorted((request.view_args or {}).items())), normalize_query_args(request.args))
+    while True:
+        try:
+            result, shared = single_flight.do(key, compute)
+        except RequestCancelled:
+            if request_cancelled():
+                raise
+            # The leader was abandoned by its client; retry so one of the followers takes over
+            continue
+        SINGLE_FLIGHT.inc((endpoint, 'follower' if shared else 'leader'))
+        return result
+
+
+def shared_build(key, build):
+    """single_flight.do() for cached structures; a follower takes over if the leader's client went away"""
+    while True:
+        try:
+            return single_flight.do(key, build)[0]
+        except RequestCancelled:
+            if request_cancelled():
+                raise
+
+
+# ============================================================
+# DERIVED DATA (cached per dataset version)
+# ============================================================
+
+_derived_cache = {}
+
+
+def derived(name, build):
+    """Return build() memoised against the current DATA_VERSION.
+
+    Concurrent first calls are coalesced so an expensive structure is only built once.
+    """
+    key = (name, DATA_VERSION)
+    value = _derived_cache.get(key)
+    record_cache_lookup(name, value is not None)
+    if value is None:
+        value = shared_build(('derived',) + key, build)
+        if value is not None:
+            _derived_cache[key] = value
+    return value
+
+
+_background_builds = set()
+_background_lock = threading.Lock()
+
+
+def derived_if_ready(name, build):
+    """The derived() value if it is already built, else None after starting the build in the background"""
+    key = (name, DATA_VERSION)
+    value = _derived_cache.get(key)
+    if value is None:
+        with _background_lock:
+            start = key not in _background_builds
+            _background_builds.add(key)
+        if start:
+            threading.Thread(target=build_in_background, args=(name, build, key), daemon=True).start()
+    return value
+
+
+def build_in_background(name, build, key):
+    try:
+        derived(name, build)
+    finally:
+        with _background_lock:
+            _background_builds.discard(key)
+
+
+def build_series_index():
+    """Market data sorted by (Market, Commodity, Arrival_Date) as flat NumPy arrays.
+
+    Series i occupies rows starts[i]:ends[i]; within a series `days` (days since epoch)
+    is non-decreasing. Rows without a modal price are left out.
+    """
+    data = df.dropna(subset=['Market', 'Commodity', 'Arrival_Date', 'Modal_Price'])
+    data = data.sort_values(['Market', 'Commodity', 'Arrival_Date'], kind='mergesort')
+
+    markets = data['Market'].to_numpy()
+    commodities = data['Commodity'].to_numpy()
+    n = len(data)
+    change = np.ones(n, dtype=bool)
+    change[1:] = (markets[1:] != markets[:-1]) | (commodities[1:] != commodities[:-1])
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], n)
+
+    series_markets = markets[starts]
+    series_commodities = commodities[starts]
+    series = np.cumsum(change) - 1
+    days = data['Arrival_Date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    return {
+        'markets': series_markets,
+        'commodities': series_commodities,
+        'states': data['State'].to_numpy()[starts],
+        'starts': starts,
+        'ends': ends,
+        'series': series,
+        'days': days,
+        # Globally sorted (series, day) composite key for vectorised as-of lookups
+        'keys': series_day_key(series, days),
+        'modal': data['Modal_Price'].to_numpy(dtype=np.float64),
+        'min': data['Min_Price'].to_numpy(dtype=np.float64),
+        'max': data['Max_Price'].to_numpy(dtype=np.float64),
+        'lookup': {(m, c): i for i, (m, c) in enumerate(zip(series_markets, series_commodities))}
+    }
+
+
+def series_day_key(series, days):
+    return (np.asarray(series, dtype=np.int64) << 32) + (np.asarray(days, dtype=np.int64) + (1 << 31))
+
+
+def series_index():
+    return derived('series-index', build_series_index)
+
+
+# Request parameters understood by apply_filters()
+FILTER_PARAMS = ('states', 'markets', 'commodities', 'start_date', 'end_date')
+GROUP_CACHE_SIZE = int(os.environ.get('GROUP_CACHE_SIZE', '32'))
+_group_cache = OrderedDict()
+_lru_lock = threading.Lock()
+
+
+def filter_key():
+    """Normalised apply_filters() parameters of the current request"""
+    return tuple(item for item in normalize_query_args(request.args) if item[0] in FILTER_PARAMS)
+
+
+def filter_values(param):
+    """Values of a list filter; commodities may also be given as one comma-separated value"""
+    values = request.args.getlist(param)
+    if param == 'commodities':
+        values = [c.strip() for value in values for c in value.split(',') if c.strip()]
+    return values
+
+
+def lru_cached(cache, size, key, build):
+    """Return build() from an LRU OrderedDict holding at most `size` entries.
+
+    key[0] names the cache for the hit/miss metrics. None results are returned but not kept.
+    """
+    with _lru_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+    record_cache_lookup(key[0], value is not None)
+    if value is None:
+        value = shared_build(('lru',) + key, build)
+        if value is not None:
+            with _lru_lock:
+                cache[key] = value
+                while len(cache) > size:
+                    cache.popitem(last=False)
+    return value
+
+
+def cached_groups(name, build):
+    """Per-filter aggregates in a small LRU keyed by dataset version and filter parameters"""
+    return lru_cached(_group_cache, GROUP_CACHE_SIZE, (name, DATA_VERSION, filter_key()), build)
+
+
+def last_row_on_or_before(index, series_ids, day):
+    """Row position of each series' last arrival on or before `day`, or -1 if it has none"""
+    rows = np.searchsorted(index['keys'], series_day_key(series_ids, day), side='right') - 1
+    return np.where(rows >= index['starts'][series_ids], rows, -1)
+
+
+def series_mask(index):
+    """Boolean mask over series honouring the states/markets/commodities request filters"""
+    mask = np.ones(len(index['markets']), dtype=bool)
+    for param, key in (('states', 'states'), ('markets', 'markets'), ('commodities', 'commodities')):
+        values = filter_values(param)
+        if values:
+            mask &= np.isin(index[key], values)
+    return mask
+
+
+def to_day(value):
+    """Parse a date query value into days since epoch"""
+    return int(pd.to_datetime(value).to_datetime64().astype('datetime64[D]').astype(np.int64))
+
+
+def day_to_str(day):
+    return str(np.datetime64(int(day), 'D'))
+
+
+VOLATILITY_WINDOWS = (7, 30, 90)
+
+
+def build_rolling_volatility(window):
+    """Rolling std of Modal_Price over the trailing `window` days ending at each row of each series.
+
+    One pass over the date-sorted series index: each row is added to a running Welford
+    mean/M2 and rows that fall out of the window are removed the same way, so every
+    window position costs O(1) amortised instead of a fresh std.
+    """
+    index = series_index()
+    days = index['days'].tolist()
+    prices = index['modal'].tolist()
+    result = np.zeros(len(days), dtype=np.float64)
+
+    for start, end in zip(index['starts'].tolist(), index['ends'].tolist()):
+        check_cancelled()
+        count, mean, m2 = 0, 0.0, 0.0
+        tail = start
+        for i in range(start, end):
+            x = prices[i]
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+
+            cutoff = days[i] - window
+            while days[tail] <= cutoff:
+                y = prices[tail]
+                if count == 1:
+                    count, mean, m2 = 0, 0.0, 0.0
+                else:
+                    delta = y - mean
+                    mean -= delta / (count - 1)
+                    m2 -= delta * (y - mean)
+                    count -= 1
+                tail += 1
+
+            result[i] = math.sqrt(max(m2, 0.0) / (count - 1)) if count > 1 else 0.0
+    return result
+
+
+def rolling_volatility(window):
+    return derived(f'volatility-{window}d', lambda: build_rolling_volatility(window))
+
+
+ROLLUP_INTERVALS = ('day', 'week', 'month')
+
+
+def bucket_days(days, interval):
+    """First day of the day/week (Monday)/month bucket containing each day"""
+    if interval == 'day':
+        return days
+    if interval == 'week':
+        # 1970-01-05 (day 4) was a Monday
+        return days - (days - 4) % 7
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+
+
+def build_daily_prices():
+    """The series index collapsed to one row per (series, day), in the same order.
+
+    modal is the mean modal price of the day's arrivals, low/high the extreme Min/Max
+    prices; series i occupies rows starts[i]:starts[i + 1].
+    """
+    index = series_index()
+    day_starts = np.flatnonzero(np.diff(index['keys'], prepend=index['keys'][0] - 1))
+    row_counts = np.diff(np.append(day_starts, len(index['keys'])))
+    series = index['series'][day_starts]
+    sums = np.add.reduceat(index['modal'], day_starts)
+    return {
+        'series': series,
+        'days': index['days'][day_starts],
+        'starts': np.searchsorted(series, np.arange(len(index['starts']))),
+        'low': np.fmin.reduceat(index['min'], day_starts),
+        'high': np.fmax.reduceat(index['max'], day_starts),
+        'sum': sums,
+        'count': row_counts,
+        'modal': sums / row_counts,
+    }
+
+
+def daily_prices():
+    return derived('daily-prices', build_daily_prices)
+
+
+def build_ohlc_rollups():
+    """Open/high/low/close/modal per (Market, Commodity) at day, week and month resolution.
+
+    Open and close are the first and last daily mean modal prices in a bucket, high/low the
+    extreme Max/Min prices, modal the mean over all arrivals. Buckets where Min/Max are
+    missing fall back to the modal price. Each level is stored as flat arrays in series order
+    with per-series offsets, so a request is a slice.
+    """
+    n_series = len(series_index()['starts'])
+    # Every coarser level is built from the daily rows
+    daily = daily_prices()
+    daily_mean = daily['modal']
+
+    rollups = {}
+    for interval in ROLLUP_INTERVALS:
+        buckets = bucket_days(daily['days'], interval)
+        keys = series_day_key(daily['series'], buckets)
+        starts = np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+        ends = np.append(starts[1:], len(keys))
+        count = np.add.reduceat(daily['count'], starts)
+        modal = np.add.reduceat(daily['sum'], starts) / count
+        low = np.fmin.reduceat(daily['low'], starts)
+        high = np.fmax.reduceat(daily['high'], starts)
+        series = daily['series'][starts]
+        rollups[interval] = {
+            'offsets': np.searchsorted(series, np.arange(n_series + 1)),
+            'dates': np.datetime_as_string(buckets[starts].astype('datetime64[D]')),
+            'open': daily_mean[starts],
+            'close': daily_mean[ends - 1],
+            'low': np.where(np.isnan(low), modal, low),
+            'high': np.where(np.isnan(high), modal, high),
+            'modal': modal,
+        }
+    return rollups
+
+
+def ohlc_rollups():
+    return derived('ohlc-rollups', build_ohlc_rollups)
+
+
+# A series with no arrival in this many days before the latest arrival is reported stale
+STALE_SERIES_DAYS = int(os.environ.get('STALE_SERIES_DAYS', '14'))
+
+
+def arrival_days():
+    """Arrival_Date of every row of df as days since epoch (NaT becomes the int64 minimum)"""
+    return derived('arrival-days', lambda: df['Arrival_Date'].to_numpy().astype('datetime64[D]').astype(np.int64))
+
+
+def build_series_quality():
+    """Per-(Market, Commodity) feed health over the full history, from day ordinals.
+
+    For each series: rows, distinct arrival days, first/last day, coverage (distinct days
+    over the days spanned), the longest run of days without an arrival, exact duplicate
+    rows and whether it has gone stale.
+    """
+    valid = (df['Market'].notna() & df['Commodity'].notna() & df['Arrival_Date'].notna()).to_numpy()
+    duplicated = df.duplicated().to_numpy()[valid]
+    data = df[valid]
+    days = arrival_days()[valid]
+    market_codes, markets = pd.factorize(data['Market'])
+    commodity_codes, commodities = pd.factorize(data['Commodity'])
+    pair = market_codes.astype(np.int64) * len(commodities) + commodity_codes
+
+    order = np.lexsort((days, pair))
+    pair, days, duplicated = pair[order], days[order], duplicated[order]
+    n = len(pair)
+    change = np.ones(n, dtype=bool)
+    change[1:] = pair[1:] != pair[:-1]
+    series = np.cumsum(change) - 1
+    starts = np.flatnonzero(change)
+    ends = np.append(starts[1:], n)
+    count = len(starts)
+
+    new_day = change.copy()
+    new_day[1:] |= days[1:] != days[:-1]
+    distinct_days = np.bincount(series[new_day], minlength=count)
+    # Gaps between consecutive distinct arrival days of the same series
+    day_rows = np.flatnonzero(new_day & ~change)
+    longest_gap = np.zeros(count, dtype=np.int64)
+    if len(day_rows):
+        previous = np.flatnonzero(new_day)[np.searchsorted(np.flatnonzero(new_day), day_rows) - 1]
+        np.maximum.at(longest_gap, series[day_rows], days[day_rows] - days[previous] - 1)
+
+    first_day = days[starts] if count else np.zeros(0, dtype=np.int64)
+    last_day = days[ends - 1] if count else np.zeros(0, dtype=np.int64)
+    latest = int(last_day.max()) if count else 0
+    return {
+        'markets': markets.to_numpy(dtype=object)[pair[starts] // max(len(commodities), 1)],
+        'commodities': commodities.to_numpy(dtype=object)[pair[starts] % max(len(commodities), 1)],
+        'states': data['State'].to_numpy(dtype=object)[order][starts],
+        'rows': np.diff(np.append(starts, n)),
+        'distinct_days': distinct_days,
+        'first_day': first_day,
+        'last_day': last_day,
+        'coverage': distinct_days / (last_day - first_day + 1),
+        'longest_gap': longest_gap,
+        'duplicate_rows': np.bincount(series[duplicated], minlength=count),
+        'stale': last_day < latest - STALE_SERIES_DAYS,
+    }
+
+
+def series_quality():
+    return derived('series-quality', build_series_quality)
+
+
+def build_market_price_matrix(commodity):
+    """Dense (market x day) modal-price matrix of one commodity from the series index.
+
+    Cell [i, d] is the mean modal price of markets[i] on day first_day + d, NaN without
+    an arrival.
+    """
+    index = series_index()
+    series = np.flatnonzero(index['commodities'] == commodity)
+    if len(series) == 0:
+        return None
+    markets = index['markets'][series]
+    order = np.argsort(markets, kind='stable')
+    series, markets = series[order], markets[order]
+
+    lengths = index['ends'][series] - index['starts'][series]
+    rows = np.concatenate([np.arange(s, e) for s, e in zip(index['starts'][series], index['ends'][series])])
+    market_pos = np.repeat(np.arange(len(series)), lengths)
+    days = index['days'][rows]
+    first_day = int(days.min())
+    width = int(days.max()) - first_day + 1
+
+    cells = market_pos * width + (days - first_day)
+    sums = np.bincount(cells, weights=index['modal'][rows], minlength=len(series) * width)
+    counts = np.bincount(cells, minlength=len(series) * width)
+    with np.errstate(invalid='ignore'):
+        matrix = (sums / counts).reshape(len(series), width)
+    return {
+        'markets': markets,
+        'states': index['states'][series],
+        'first_day': first_day,
+        'matrix': matrix
+    }
+
+
+# Matrices are market x day per commodity, so only the most recently requested are kept
+MARKET_MATRIX_CACHE_SIZE = int(os.environ.get('MARKET_MATRIX_CACHE_SIZE', '8'))
+_market_matrix_cache = OrderedDict()
+
+
+def market_price_matrix(commodity):
+    """Cached build_market_price_matrix(); unknown commodities are not cached"""
+    return lru_cached(_market_matrix_cache, MARKET_MATRIX_CACHE_SIZE, ('market-matrix', DATA_VERSION, commodity),
+                      lambda: build_market_price_matrix(commodity))
+
+
+# Each daily price is scored against this many previous trading days of its own series
+ANOMALY_WINDOW = 30
+# Days with fewer previous trading days than this are not scored
+MIN_ANOMALY_HISTORY = 10
+# Robust z-scores at or beyond this magnitude go into the anomaly index
+ANOMALY_Z_THRESHOLD = 3.5
+ANOMALY_CHUNK_ROWS = 65536
+
+
+def rolling_robust_z(daily, rows):
+    """Robust z-score of each given daily row against the previous ANOMALY_WINDOW rows of its series.
+
+    z = (price - median) / (1.4826 * MAD) over the trailing window; NaN where the series
+    has too little history or a zero MAD. Windows are gathered as a (rows x window) block,
+    so scoring only newly appended rows costs O(new rows).
+    """
+    modal = daily['modal']
+    first_row = daily['starts'][daily['series'][rows]]
+    window = rows[:, None] - ANOMALY_WINDOW + np.arange(ANOMALY_WINDOW)
+    in_series = window >= first_row[:, None]
+    values = np.where(in_series, modal[np.maximum(window, 0)], np.nan)
+    with warnings.catch_warnings():
+        # Windows without history are all-NaN; they are masked out below
+        warnings.simplefilter('ignore', RuntimeWarning)
+        median = np.nanmedian(values, axis=1)
+        mad = np.nanmedian(np.abs(values - median[:, None]), axis=1)
+    scored = (in_series.sum(axis=1) >= MIN_ANOMALY_HISTORY) & (mad > 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = np.where(scored, (modal[rows] - median) / (1.4826 * mad), np.nan)
+    return z, median
+
+
+def build_anomaly_index():
+    """Daily prices whose robust z-score reaches ANOMALY_Z_THRESHOLD, ordered by |z| descending.
+
+    Same-day arrivals are averaged first, so each series reports at most one anomaly per day
+    and the window spans ANOMALY_WINDOW trading days rather than arrivals.
+    """
+    daily = daily_prices()
+    n = len(daily['modal'])
+    z = np.empty(n)
+    median = np.empty(n)
+    for start in range(0, n, ANOMALY_CHUNK_ROWS):
+        check_cancelled()
+        rows = np.arange(start, min(start + ANOMALY_CHUNK_ROWS, n))
+        z[rows], median[rows] = rolling_robust_z(daily, rows)
+
+    flagged = np.flatnonzero(np.abs(np.nan_to_num(z)) >= ANOMALY_Z_THRESHOLD)
+    flagged = flagged[np.argsort(-np.abs(z[flagged]), kind='stable')]
+    return {
+        'series': daily['series'][flagged],
+        'days': daily['days'][flagged],
+        'price': daily['modal'][flagged],
+        'z': z[flagged],
+        'median': median[flagged],
+        'scored': int(np.count_nonzero(~np.isnan(z)))
+    }
+
+
+def anomaly_index():
+    return derived('anomaly-index', build_anomaly_index)
+
+
+def top_n(labels, values, n):
+    """Labels of the n largest per-label means, found with a partial sort"""
+    codes, uniques = pd.factorize(labels)
+    means = np.bincount(codes, weights=values) / np.bincount(codes)
+    if len(means) > n:
+        top = np.argpartition(-means, n - 1)[:n]
+    else:
+        top = np.arange(len(means))
+    return uniques[top]
+
+
+# ============================================================
+# DOWNSAMPLING
+# ============================================================
+
+def max_points_arg():
+    """Requested ?max_points= budget (at least 3), or None to return every point"""
+    max_points = request.args.get('max_points', type=int)
+    if max_points is None or max_points <= 0:
+        return None
+    return max(max_points, 3)
+
+
+def bucket_starts(n, buckets):
+    """Start offsets of `buckets` near-equal contiguous buckets over n points"""
+    return np.unique(np.linspace(0, n, buckets, endpoint=False).astype(np.int64))
+
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that preserve the visual shape.
+
+    The first and last points are always kept. Each middle bucket keeps the point forming the
+    largest triangle with the point kept from the previous bucket and the mean of the next one;
+    the search inside a bucket is a single vectorised area computation.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket edges over the interior points 1..n-2
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    # Next-bucket means, computed for all buckets at once from cumulative sums
+    cx = np.concatenate(([0.0], np.cumsum(x)))
+    cy = np.concatenate(([0.0], np.cumsum(y)))
+    next_lo = np.append(edges[1:-1], n - 1)
+    next_hi = np.append(edges[2:], n)
+    avg_x = (cx[next_hi] - cx[next_lo]) / (next_hi - next_lo)
+    avg_y = (cy[next_hi] - cy[next_lo]) / (next_hi - next_lo)
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        areas = np.abs((x[a] - avg_x[i]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[i] - y[a]))
+        a = lo + int(np.argmax(areas))
+        selected[i + 1] = a
+    return selected
+
+
+# ============================================================
+# SKETCHES (approx=true)
+# ============================================================
+# Market data is cut into partitions of (State, Commodity, calendar month). Each partition
+# keeps exact row/price totals, a day-of-month bitmask, a HyperLogLog sketch of its markets,
+# a log-bucketed quantile sketch of modal prices and a bottom-k sample. All of them merge
+# with a vectorised reduction, so an approx=true answer costs O(selected partitions), not
+# O(rows). Date filters are widened to whole months; the markets filter is not partitioned
+# and always gets the exact answer.
+
+# HyperLogLog registers per sketch (2^p); relative standard error 1.04 / sqrt(2^p)
+HLL_PRECISION = 10
+# Quantile sketch relative accuracy: every reported quantile is within this fraction of a true price
+QUANTILE_ACCURACY = 0.01
+# Rows kept per partition and returned per commodity by the bottom-k sample
+SKETCH_SAMPLE_SIZE = int(os.environ.get('SKETCH_SAMPLE_SIZE', '1000'))
+DISTRIBUTION_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+def approx_requested():
+    return request.args.get('approx', '').lower() in ('1', 'true', 'yes')
+
+
+def popcount32(values):
+    return np.unpackbits(np.ascontiguousarray(values, dtype='<u4').view(np.uint8)).reshape(-1, 32).sum(axis=1)
+
+
+def hll_rank(hashes, precision):
+    """Register index and rank (position of the first set bit) of each 64-bit hash"""
+    width = 64 - precision
+    registers = (hashes >> np.uint64(width)).astype(np.int64)
+    rest = (hashes & np.uint64((1 << width) - 1)).astype(np.float64)
+    # frexp gives bit_length for positive values; an all-zero suffix gets the maximum rank
+    bit_length = np.where(rest > 0, np.frexp(rest)[1], 0)
+    return registers, (width - bit_length + 1).astype(np.uint8)
+
+
+def hll_estimate(registers):
+    """Cardinality from merged HyperLogLog registers, with the small-range correction"""
+    m = len(registers)
+    raw = (0.7213 / (1 + 1.079 / m)) * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if raw <= 2.5 * m and zeros:
+        return m * math.log(m / zeros)
+    return raw
+
+
+def quantile_bins(prices):
+    """Log-spaced bucket of each price; bucket 0 holds everything below 1"""
+    log_gamma = math.log((1 + QUANTILE_ACCURACY) / (1 - QUANTILE_ACCURACY))
+    bins = np.ceil(np.log(np.maximum(prices, 1.0)) / log_gamma).astype(np.int64) + 1
+    return np.where(prices < 1.0, 0, bins)
+
+
+def bin_quantiles(counts, quantiles):
+    """Quantile estimates from merged bucket counts, each within QUANTILE_ACCURACY of the truth"""
+    gamma = (1 + QUANTILE_ACCURACY) / (1 - QUANTILE_ACCURACY)
+    cumulative = np.cumsum(counts)
+    ranks = np.asarray(quantiles) * (cumulative[-1] - 1)
+    bins = np.searchsorted(cumulative, ranks, side='right')
+    return np.where(bins == 0, 0.0, 2 * gamma ** (bins - 1.0) / (gamma + 1))
+
+
+def grouped_entries(partition, count, *columns):
+    """Sort per-partition entries by partition and return (offsets, columns...)"""
+    order = np.argsort(partition, kind='stable')
+    return (np.searchsorted(partition[order], np.arange(count + 1)), *[c[order] for c in columns])
+
+
+def build_sketches():
+    """Per-partition totals and mergeable sketches over the full market data"""
+    data = df
+    n = len(data)
+    state_codes, states = pd.factorize(data['State'])
+    commodity_codes, commodities = pd.factorize(data['Commodity'])
+    dates = data['Arrival_Date'].to_numpy().astype('datetime64[D]')
+    dated = ~np.isnat(dates)
+    days = np.where(dated, dates.astype(np.int64), 0)
+    months = np.where(dated, dates.astype('datetime64[M]').astype(np.int64), -1)
+    day_of_month = days - np.where(dated, dates.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64), 0)
+
+    # Partition = (state, commodity, month) packed into one int64 key; sorted factorize keeps
+    # partitions in (state, commodity, month) order
+    month_codes, month_values = pd.factorize(months, sort=True)
+    n_commodities, n_months = len(commodities) + 1, max(len(month_values), 1)
+    keys = ((state_codes.astype(np.int64) + 1) * n_commodities + commodity_codes + 1) * n_months + month_codes
+    partition, partition_keys = pd.factorize(keys, sort=True)
+    count = len(partition_keys)
+
+    modal = data['Modal_Price'].to_numpy(dtype=np.float64)
+    priced = ~np.isnan(modal)
+    # Each (partition, day of month) bit once, so summing the bits ORs them
+    dated_partition = partition[dated]
+    day_slots = pd.unique(dated_partition.astype(np.int64) << 5 | day_of_month[dated])
+    day_bits = np.bincount(day_slots >> 5, weights=np.left_shift(1, day_slots & 31).astype(np.float64),
+                           minlength=count).astype(np.uint32)
+    first_day = np.full(count, np.iinfo(np.int64).max)
+    last_day = np.full(count, np.iinfo(np.int64).min)
+    day_range = pd.Series(days[dated]).groupby(dated_partition).agg(['min', 'max'])
+    first_day[day_range.index] = day_range['min']
+    last_day[day_range.index] = day_range['max']
+
+    # HyperLogLog of markets: keep the maximum rank per (partition, register)
+    # Hash each distinct market once rather than every row
+    market_codes, markets = pd.factorize(data['Market'])
+    has_market = market_codes >= 0
+    hashes = pd.util.hash_array(markets.to_numpy(dtype=object))[market_codes[has_market]]
+    registers, ranks = hll_rank(hashes, HLL_PRECISION)
+    slot = partition[has_market].astype(np.int64) * (1 << HLL_PRECISION) + registers
+    best = pd.Series(ranks).groupby(slot).max()
+    slots = best.index.to_numpy(dtype=np.int64)
+    hll_offsets, hll_registers, hll_ranks = grouped_entries(
+        slots >> HLL_PRECISION, count, slots & ((1 << HLL_PRECISION) - 1), best.to_numpy(dtype=np.uint8))
+
+    # Quantile sketch: counts per (partition, price bucket)
+    bucket_slot, bucket_count = np.unique(
+        partition[priced].astype(np.int64) << 32 | quantile_bins(modal[priced]), return_counts=True)
+    bin_offsets, bin_ids, bin_counts = grouped_entries(
+        bucket_slot >> 32, count, bucket_slot & 0xFFFFFFFF, bucket_count)
+
+    # Bottom-k sample: the SKETCH_SAMPLE_SIZE smallest random keys of each partition. The k
+    # smallest keys of any union of partitions are always among the ones kept, so merging
+    # gives a uniform sample without replacement of the selection.
+    sample_keys = np.random.default_rng(0).random(n)[priced]
+    sample_partition = partition[priced]
+    order = np.lexsort((sample_keys, sample_partition))
+    sample_partition = sample_partition[order]
+    rank_in_partition = np.arange(len(order)) - np.searchsorted(sample_partition, sample_partition)
+    kept = order[rank_in_partition < SKETCH_SAMPLE_SIZE]
+    sample_offsets, sample_keys, sample_prices = grouped_entries(
+        partition[priced][kept], count, sample_keys[kept], modal[priced][kept])
+
+    return {
+        'states': states, 'commodities': commodities,
+        'state': partition_keys // n_months // n_commodities - 1,
+        'commodity': partition_keys // n_months % n_commodities - 1,
+        'month': month_values[partition_keys % n_months],
+        'rows': np.bincount(partition, minlength=count),
+        'price_count': np.bincount(partition[priced], minlength=count),
+        'price_sum': np.bincount(partition[priced], weights=modal[priced], minlength=count),
+        'day_bits': day_bits, 'first_day': first_day, 'last_day': last_day,
+        'hll': (hll_offsets, hll_registers, hll_ranks),
+        'bins': (bin_offsets, bin_ids, bin_counts),
+        'sample': (sample_offsets, sample_keys, sample_prices),
+    }
+
+
+def sketches():
+    return derived('sketches', build_sketches)
+
+
+def entries_for(grouped, selected):
+    """Entries of the selected partitions from a (offsets, columns...) tuple"""
+    mask = np.repeat(selected, np.diff(grouped[0]))
+    return [column[mask] for column in grouped[1:]]
+
+
+def sketch_selection():
+    """(partition mask, approx block) for the request filters, or None if they cannot be sketched.
+
+    Until the sketches are built (e.g. on a cold serverless instance) this is None as well, so
+    the request takes the exact path instead of waiting for the build.
+    """
+    if request.args.getlist('markets'):
+        return None
+    sketch = derived_if_ready('sketches', build_sketches)
+    if sketch is None:
+        return None
+    selected = np.ones(len(sketch['rows']), dtype=bool)
+    for param, labels, codes in (('states', sketch['states'], sketch['state']),
+                                 ('commodities', sketch['commodities'], sketch['commodity'])):
+        values = filter_values(param)
+        if values:
+            selected &= np.isin(codes, np.flatnonzero(labels.isin(values)))
+
+    # Whole months overlapping the date range; rows of partial boundary months are counted too
+    boundary = np.zeros_like(selected)
+    for param, compare in (('start_date', np.greater_equal), ('end_date', np.less_equal)):
+        if request.args.get(param):
+            day = np.datetime64(pd.to_datetime(request.args[param]).date(), 'D')
+            month = day.astype('datetime64[M]').astype(np.int64)
+            selected &= (sketch['month'] >= 0) & compare(sketch['month'], month)
+            edge = sketch['month'] == month
+            if param == 'start_date':
+                edge &= sketch['first_day'] < day.astype(np.int64)
+            else:
+                edge &= sketch['last_day'] > day.astype(np.int64)
+            boundary |= edge
+    record_rows(len(selected), int(np.count_nonzero(selected)))
+    return selected, {
+        'method': 'sketch',
+        'date_granularity': 'month',
+        # Records from boundary months that may lie outside the requested dates
+        'boundary_records': int(sketch['rows'][selected & boundary].sum()),
+    }
+
+
+def approx_distinct_markets(selected):
+    """(estimate, relative standard error) of distinct markets in the selected partitions"""
+    registers, ranks = entries_for(sketches()['hll'], selected)
+    merged = np.zeros(1 << HLL_PRECISION, dtype=np.uint8)
+    np.maximum.at(merged, registers, ranks)
+    return hll_estimate(merged), 1.04 / math.sqrt(1 << HLL_PRECISION)
+
+
+def filter_mask(data):
+    """Boolean row mask for the states/markets/commodities/date filters in the request"""
+    mask = np.ones(len(data), dtype=bool)
 
     # Get filter parameters
     states = request.args.getlist('states')
     markets = request.args.getlist('markets')
-    commodities = request.args.getlist('commodities')
+    commodities = filter_values('commodities')
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
 
     # Apply state filter
     if states and len(states) > 0:
-        filtered_df = filtered_df[filtered_df['State'].isin(states)]
+        mask &= data['State'].isin(states).to_numpy()
 
     # Apply market filter
     if markets and len(markets) > 0:
-        filtered_df = filtered_df[filtered_df['Market'].isin(markets)]
+        mask &= data['Market'].isin(markets).to_numpy()
 
     # Apply commodity filter
     if commodities and len(commodities) > 0:
-        filtered_df = filtered_df[filtered_df['Commodity'].isin(commodities)]
+        mask &= data['Commodity'].isin(commodities).to_numpy()
 
     # Apply date range filter
     if start_date:
         start_dt = pd.to_datetime(start_date)
-        filtered_df = filtered_df[filtered_df['Arrival_Date'] >= start_dt]
+        mask &= (data['Arrival_Date'] >= start_dt).to_numpy()
 
     if end_date:
         end_dt = pd.to_datetime(end_date)
-        filtered_df = filtered_df[filtered_df['Arrival_Date'] <= end_dt]
+        mask &= (data['Arrival_Date'] <= end_dt).to_numpy()
+
+    return mask
+
 
+def apply_filters(data):
+    """Apply filters from request parameters to dataframe"""
+    check_cancelled()
+    with timed_phase('filter'):
+        # One combined mask, so only the final selection is copied
+        filtered_df = data[filter_mask(data)]
+
+    record_rows(len(data), len(filtered_df))
     return filtered_df
 
 
@@ -201,13 +1519,66 @@ def health_check():
     })
 
 
+@app.route('/api/version', methods=['GET'])
+def get_version():
+    """Content versions of the loaded market and prediction data, for client-side caches"""
+    response = jsonify({
+        'data_version': DATA_VERSION,
+        'predictions_version': PREDICTIONS_VERSION
+    })
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus text exposition of request latency, phase, size, row and cache metrics"""
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    lines.append('# HELP agrimarket_market_records Rows currently loaded from market_data')
+    lines.append('# TYPE agrimarket_market_records gauge')
+    lines.append(f'agrimarket_market_records {len(df)}')
+    lines.append('# HELP agrimarket_prediction_records Rows currently loaded from predicted_prices')
+    lines.append('# TYPE agrimarket_prediction_records gauge')
+    lines.append(f'agrimarket_prediction_records {len(predictions_df)}')
+    lines.append('# HELP agrimarket_single_flight_in_flight Coalesced computations currently running')
+    lines.append('# TYPE agrimarket_single_flight_in_flight gauge')
+    lines.append(f'agrimarket_single_flight_in_flight {single_flight.in_flight()}')
+    return Response('\n'.join(lines) + '\n', content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/api/profiles', methods=['GET'])
+def get_profiles():
+    """Hottest sampled stacks per endpoint, aggregated across profiled and sampled requests"""
+    if not profiling_authorised():
+        return jsonify({'error': 'Profiling not authorised'}), 403
+
+    limit = request.args.get('limit', 20, type=int)
+    # Optional substring filter, e.g. match=pandas or match=json
+    match = request.args.get('match', '')
+    with PROFILE_AGGREGATE_LOCK:
+        snapshot = {endpoint: (entry['requests'], dict(entry['stacks']))
+                    for endpoint, entry in PROFILE_AGGREGATE.items()}
+
+    result = {}
+    for endpoint, (requests_profiled, stacks) in sorted(snapshot.items()):
+        if match:
+            stacks = {stack: count for stack, count in stacks.items() if match in stack}
+        result[endpoint] = {
+            'requests': requests_profiled,
+            'samples': sum(stacks.values()),
+            'hottest': hottest_stacks(stacks, limit)
+        }
+    return jsonify({'sample_rate': PROFILE_SAMPLE_RATE, 'endpoints': result})
+
+
 @app.route('/api/states', methods=['GET'])
 def get_states():
     """Get list of all states"""
     if df.empty:
         return jsonify([])
-    states = sorted(df['State'].dropna().unique().tolist())
-    return jsonify(states)
+    return jsonify(derived('states', lambda: sorted(df['State'].dropna().unique().tolist())))
 
 
 @app.route('/api/commodities', methods=['GET'])
@@ -300,6 +1671,10 @@ def get_kpis():
             'selectedCommodities': 0
         })
     
+    selection = sketch_selection() if approx_requested() else None
+    if selection is not None:
+        return jsonify(approx_kpis(*selection))
+
     # Apply filters
     filtered_df = apply_filters(df)
     
@@ -321,6 +1696,26 @@ def get_kpis():
     })
 
 
+def approx_kpis(selected, approx):
+    """KPIs from the partition sketches; only totalMarkets is estimated"""
+    sketch = sketches()
+    price_count = sketch['price_count'][selected].sum()
+    if not sketch['rows'][selected].sum():
+        markets, error = 0, 0.0
+    else:
+        markets, error = approx_distinct_markets(selected)
+    approx['errors'] = {'totalMarkets': {
+        'relative_std_error': round(error, 4),
+        'interval_95': [max(int(markets * (1 - 2 * error)), 0), int(math.ceil(markets * (1 + 2 * error)))]
+    }}
+    return {
+        'totalMarkets': int(round(markets)),
+        'avgModalPrice': round(float(sketch['price_sum'][selected].sum() / price_count), 2) if price_count else 0.0,
+        'selectedCommodities': int(len(np.unique(sketch['commodity'][selected & (sketch['commodity'] >= 0)]))),
+        'approx': approx
+    }
+
+
 @app.route('/api/commodities-by-count', methods=['GET'])
 def get_commodities_by_count():
     """Get top 10 commodities by count with optional filters"""
@@ -403,6 +1798,15 @@ def get_forecast_data(commodity):
     if hist_df.empty and pred_df.empty:
         return jsonify({'error': f'No data available for commodity: {commodity} in market: {market}'}), 404
 
+    # Shape-preserving downsampling of each line before formatting
+    max_points = max_points_arg()
+    if max_points:
+        hist_df = hist_df.iloc[lttb_indices(hist_df['Arrival_Date'].to_numpy().astype('datetime64[D]').astype(np.float64),
+                                            hist_df['Modal_Price'].to_numpy(dtype=np.float64), max_points)]
+        pred_df = pred_df.sort_values('ds')
+        pred_df = pred_df.iloc[lttb_indices(pred_df['ds'].to_numpy().astype('datetime64[D]').astype(np.float64),
+                                            pred_df['Predicted_Price'].to_numpy(dtype=np.float64), max_points)]
+
     # Format historical data
     historical = hist_df[['Arrival_Date', 'Modal_Price']].copy()
     historical.columns = ['date', 'price']
@@ -541,38 +1945,45 @@ def get_price_for_date(commodity):
 def get_candlestick_data(commodity):
     """
     Candlestick chart data for historical price volatility (data.db)
-    Shows Min_Price, Max_Price, Modal_Price for each date
+    Shows open/high/low/close and mean modal price per day, week or month (?interval=)
     """
     if df.empty:
         return jsonify({'error': 'No data available'}), 404
     
     market = request.args.get('market', 'Udumalpet')
-    commodity_df = df[(df['Market'] == market) & (df['Commodity'] == commodity)].copy()
-    
-    if commodity_df.empty:
+    interval = request.args.get('interval', 'day')
+    if interval not in ROLLUP_INTERVALS:
+        return jsonify({'error': f'interval must be one of {list(ROLLUP_INTERVALS)}'}), 400
+
+    series = series_index()['lookup'].get((market, commodity))
+    if series is None:
         return jsonify({'error': f'No data for commodity: {commodity}'}), 404
-    
-    # Parse dates and group by date
-    commodity_df['Date'] = pd.to_datetime(commodity_df['Arrival_Date'], dayfirst=True).dt.date
-    
-    daily_data = commodity_df.groupby('Date').agg({
-        'Min_Price': 'min',
-        'Max_Price': 'max',
-        'Modal_Price': 'mean'
-    }).reset_index().sort_values('Date')
-    
-    data = []
-    for _, row in daily_data.iterrows():
-        data.append({
-            'date': row['Date'].strftime('%Y-%m-%d'),
-            'min': round(float(row['Min_Price']), 2),
-            'max': round(float(row['Max_Price']), 2),
-            'modal': round(float(row['Modal_Price']), 2)
-        })
+
+    level = ohlc_rollups()[interval]
+    lo, hi = level['offsets'][series], level['offsets'][series + 1]
+    dates = level['dates'][lo:hi]
+    opens, closes = level['open'][lo:hi], level['close'][lo:hi]
+    lows, highs, modals = level['low'][lo:hi], level['high'][lo:hi], level['modal'][lo:hi]
+
+    # Min/max buckets keep every extreme visible when the series is longer than the chart
+    max_points = max_points_arg()
+    if max_points and len(dates) > max_points:
+        starts = bucket_starts(len(dates), max_points)
+        ends = np.append(starts[1:], len(dates))
+        dates, opens, closes = dates[starts], opens[starts], closes[ends - 1]
+        lows = np.minimum.reduceat(lows, starts)
+        highs = np.maximum.reduceat(highs, starts)
+        modals = np.add.reduceat(modals, starts) / (ends - starts)
+
+    data = [{'date': d, 'open': o, 'min': l, 'max': h, 'close': c, 'modal': m}
+            for d, o, l, h, c, m in zip(dates.tolist(), np.round(opens, 2).tolist(), np.round(lows, 2).tolist(),
+                                        np.round(highs, 2).tolist(), np.round(closes, 2).tolist(),
+                                        np.round(modals, 2).tolist())]
     
     return jsonify({
         'commodity': commodity,
         'market': market,
+        'interval': interval,
         'data': data
     })
 
@@ -587,20 +1998,21 @@ def get_historical_calendar(commodity):
         return jsonify({'error': 'No data available'}), 404
     
     market = request.args.get('market', 'Udumalpet')
-    commodity_df = df[(df['Market'] == market) & (df['Commodity'] == commodity)].copy()
-    
-    if commodity_df.empty:
+    series = series_index()['lookup'].get((market, commodity))
+    if series is None:
         return jsonify({'error': f'No data for commodity: {commodity}'}), 404
-    
-    commodity_df['Date'] = pd.to_datetime(commodity_df['Arrival_Date'], dayfirst=True).dt.date
-    daily_avg = commodity_df.groupby('Date')['Modal_Price'].mean().reset_index()
-    
-    data = []
-    for _, row in daily_avg.iterrows():
-        data.append({
-            'date': row['Date'].strftime('%Y-%m-%d'),
-            'price': round(float(row['Modal_Price']), 2)
-        })
+
+    daily = ohlc_rollups()['day']
+    lo, hi = daily['offsets'][series], daily['offsets'][series + 1]
+    dates = daily['dates'][lo:hi]
+    prices = daily['modal'][lo:hi]
+
+    max_points = max_points_arg()
+    if max_points:
+        keep = lttb_indices(dates.astype('datetime64[D]').astype(np.float64), prices, max_points)
+        dates, prices = dates[keep], prices[keep]
+
+    data = [{'date': d, 'price': p} for d, p in zip(dates.tolist(), np.round(prices, 2).tolist())]
     
     return jsonify({
         'commodity': commodity,
@@ -657,7 +2069,7 @@ def get_seasonality_decomposition(commodity):
 def get_forecast_uncertainty(commodity):
     """
     Forecast with confidence intervals (predictions.db)
-    Shows predicted price with upper and lower bounds
+    Shows predicted price with empirical lower and upper bounds at several coverage levels
     """
     if predictions_df.empty:
         return jsonify({'error': 'No prediction data available'}), 404
@@ -665,30 +2077,27 @@ def get_forecast_uncertainty(commodity):
     # Get market parameter, default to Udumalpet for backward compatibility
     market = request.args.get('market', 'Udumalpet')
 
-    pred_commodity = predictions_df[(predictions_df['Commodity'] == commodity) & (predictions_df['Market'] == market)].copy()
+    # Coverage for the lower/upper fields; accepts 0.8 or 80
+    level = request.args.get('level', DEFAULT_INTERVAL_LEVEL, type=float)
+    level = round(level / 100 if level > 1 else level, 4)
+    if level not in INTERVAL_LEVELS:
+        return jsonify({'error': f'level must be one of {list(INTERVAL_LEVELS)}'}), 400
 
-    if pred_commodity.empty:
+    series = FORECAST_SERIES.get((market, commodity))
+    if series is None:
         return jsonify({'error': f'No predictions for commodity: {commodity} in market: {market}'}), 404
 
-    pred_commodity = pred_commodity.sort_values('ds')
-
-    data = []
-    for _, row in pred_commodity.iterrows():
-        predicted_price = float(row['Predicted_Price'])
-        # Calculate 10% confidence intervals if not available
-        lower_bound = round(predicted_price * 0.9, 2)
-        upper_bound = round(predicted_price * 1.1, 2)
-
-        data.append({
-            'date': row['ds'].strftime('%Y-%m-%d') if hasattr(row['ds'], 'strftime') else str(row['ds']),
-            'predicted': round(predicted_price, 2),
-            'lower': lower_bound,
-            'upper': upper_bound
-        })
+    lower, upper = series['bands'][level]
+    data = [{'date': d, 'predicted': p, 'lower': lo, 'upper': hi}
+            for d, p, lo, hi in zip(series['dates'], series['predicted'], lower, upper)]
 
     return jsonify({
         'commodity': commodity,
         'market': market,
+        'level': level,
+        'method': series['method'],
+        'residuals': series['residuals'],
+        'intervals': {str(round(l * 100)): {'lower': lo, 'upper': hi} for l, (lo, hi) in series['bands'].items()},
         'data': data
     })
 
@@ -739,83 +2148,395 @@ def get_market_commodities(market):
     })
 
 
+# Sortable price-details columns and their default order
+PRICE_DETAIL_SORTS = {'avg_price': 'desc', 'commodity': 'asc', 'market': 'asc'}
+MAX_PAGE_SIZE = 1000
+
+
 @app.route('/api/price-details', methods=['GET'])
 def get_price_details():
-    """Get detailed price breakdown by commodity and market with optional filters"""
+    """Get detailed price breakdown by commodity and market with optional filters.
+
+    With any of limit/cursor/sort/order the response is one page:
+    {data, total, next_cursor, sort, order, limit}; otherwise the full list as before.
+    """
     if df.empty:
         return jsonify([])
-    
+
+    if not any(param in request.args for param in ('limit', 'cursor', 'sort', 'order')):
+        if wants_arrow():
+            pairs = price_detail_pairs()
+            order = np.argsort(-pairs['avg_price'], kind='stable')
+            return arrow_response({name: values[order] for name, values in pairs.items()})
+        return jsonify(coalesced(compute_price_details))
+
+    limit = min(max(request.args.get('limit', 50, type=int), 1), MAX_PAGE_SIZE)
+    sort = request.args.get('sort', 'avg_price')
+    if sort not in PRICE_DETAIL_SORTS:
+        return jsonify({'error': f'sort must be one of {list(PRICE_DETAIL_SORTS)}'}), 400
+    order = request.args.get('order', PRICE_DETAIL_SORTS[sort])
+    if order not in ('asc', 'desc'):
+        return jsonify({'error': 'order must be asc or desc'}), 400
+
+    after = None
+    query_hash = hashlib.sha1(repr(filter_key()).encode('utf-8')).hexdigest()[:10]
+    if request.args.get('cursor'):
+        try:
+            cursor = decode_cursor(request.args['cursor'])
+            version, cursor_query, cursor_sort, cursor_order, after = cursor
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+        if version != DATA_VERSION:
+            return jsonify({'error': 'Cursor expired: the dataset has changed, start from the first page'}), 410
+        if (cursor_query, cursor_sort, cursor_order) != (query_hash, sort, order):
+            return jsonify({'error': 'Cursor does not match this query'}), 400
+        if not valid_cursor_position(after, sort):
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    page, has_more = page_price_details(limit, sort, order, after)
+    next_cursor = None
+    if has_more:
+        last = page[-1]
+        next_cursor = encode_cursor([DATA_VERSION, query_hash, sort, order,
+                                     [last[sort], last['commodity'], last['market']]])
+    return jsonify({
+        'data': page,
+        'total': len(price_detail_pairs()['avg_price']),
+        'next_cursor': next_cursor,
+        'sort': sort,
+        'order': order,
+        'limit': limit
+    })
+
+
+def encode_cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def valid_cursor_position(after, sort):
+    """True if `after` is a [sort value, commodity, market] triple page_price_details() can compare"""
+    if not isinstance(after, list) or len(after) != 3:
+        return False
+    value, commodity, market = after
+    if sort == 'avg_price':
+        value_ok = isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+    else:
+        value_ok = isinstance(value, str)
+    return value_ok and isinstance(commodity, str) and isinstance(market, str)
+
+
+def decode_cursor(token):
+    padded = token + '=' * (-len(token) % 4)
+    try:
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (UnicodeError, base64.binascii.Error, json.JSONDecodeError) as e:
+        raise ValueError(str(e))
+
+
+def build_price_detail_pairs():
+    """Average modal price per (commodity, market) for the current filters as NumPy arrays"""
+    filtered_df = apply_filters(df)
+    grouped = filtered_df.groupby(['Commodity', 'Market'])['Modal_Price'].mean().dropna()
+    return {
+        'commodity': grouped.index.get_level_values(0).to_numpy(dtype=object),
+        'market': grouped.index.get_level_values(1).to_numpy(dtype=object),
+        'avg_price': grouped.to_numpy(dtype=np.float64)
+    }
+
+
+def price_detail_pairs():
+    return cached_groups('price-details', build_price_detail_pairs)
+
+
+def page_price_details(limit, sort, order, after):
+    """One page of (commodity, market) averages ordered by `sort`, then commodity, then market.
+
+    `after` is the [sort value, commodity, market] of the last row already served. Only the
+    rows past it are considered, and only the `limit` best of those are fully sorted: a
+    partition on the sort key finds the cut-off, so a page costs O(pairs), not O(pairs log pairs).
+    """
+    pairs = price_detail_pairs()
+    commodity, market = pairs['commodity'], pairs['market']
+    primary = pairs[sort]
+
+    rows = np.arange(len(primary))
+    if after is not None:
+        last_value, last_commodity, last_market = after
+        beyond = primary < last_value if order == 'desc' else primary > last_value
+        tie_after = (commodity > last_commodity) | ((commodity == last_commodity) & (market > last_market))
+        rows = np.flatnonzero(beyond | ((primary == last_value) & tie_after))
+
+    if sort == 'avg_price':
+        rank = primary[rows]
+    else:
+        rank = pd.factorize(primary[rows], sort=True)[0]
+    if order == 'desc':
+        rank = -rank
+
+    candidates = np.arange(len(rows))
+    if len(rows) > limit:
+        cutoff = np.partition(rank, limit - 1)[limit - 1]
+        candidates = np.flatnonzero(rank <= cutoff)
+    commodity_rank = pd.factorize(commodity[rows][candidates], sort=True)[0]
+    market_rank = pd.factorize(market[rows][candidates], sort=True)[0]
+    chosen = rows[candidates[np.lexsort((market_rank, commodity_rank, rank[candidates]))[:limit]]]
+
+    page = [{'commodity': c, 'market': m, 'avg_price': float(v)}
+            for c, m, v in zip(commodity[chosen], market[chosen], pairs['avg_price'][chosen])]
+    return page, len(rows) > limit
+
+
+def compute_price_details():
+    """Average modal price per (commodity, market) for the current filters, highest first"""
     # Apply filters
     filtered_df = apply_filters(df)
     
     if filtered_df.empty:
-        return jsonify([])
+        return []
     
     # Group by commodity and market to get average prices
     price_details = filtered_df.groupby(['Commodity', 'Market'])['Modal_Price'].mean().reset_index()
     price_details.columns = ['commodity', 'market', 'avg_price']
     price_details = price_details.sort_values('avg_price', ascending=False)
     
-    data = price_details.to_dict('records')
-    return jsonify(data)
+    return price_details.to_dict('records')
+
+
+# Columns of market_data that /api/export can project
+EXPORT_COLUMNS = ['State', 'District', 'Market', 'Commodity', 'Variety', 'Grade', 'Arrival_Date',
+                  'Min_Price', 'Max_Price', 'Modal_Price', 'Commodity_Code']
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+EXPORT_CHUNK_ROWS = int(os.environ.get('EXPORT_CHUNK_ROWS', '50000'))
+
+
+@app.route('/api/export', methods=['GET'])
+def export_market_data():
+    """
+    Stream filtered market_data rows as CSV, NDJSON, Arrow IPC stream or Parquet
+    Accepts the apply_filters() parameters plus format= and columns= (comma separated)
+    """
+    if df.empty:
+        return jsonify({'error': 'No data available'}), 404
+
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'format must be one of {list(EXPORT_FORMATS)}'}), 400
+
+    columns = [c.strip() for value in request.args.getlist('columns') for c in value.split(',') if c.strip()]
+    columns = columns or EXPORT_COLUMNS
+    unknown = [c for c in columns if c not in EXPORT_COLUMNS]
+    if unknown:
+        return jsonify({'error': f'Unknown columns: {unknown}'}), 400
+
+    if export_format in ('arrow', 'parquet'):
+        try:
+            import pyarrow
+        except ImportError:
+            return jsonify({'error': f'{export_format} export needs pyarrow installed on the server'}), 501
+
+    data = df
+    columns = [c for c in columns if c in data.columns]
+    with timed_phase('filter'):
+        # Row positions only; the rows themselves are materialised one chunk at a time
+        positions = np.flatnonzero(filter_mask(data))
+    record_rows(len(data), len(positions))
+
+    # The body is generated after the handler returns, so watch the serving layer's flag directly
+    cancelled = request.environ.get(CANCEL_EVENT_KEY)
+
+    def chunks():
+        for i in range(0, max(len(positions), 1), EXPORT_CHUNK_ROWS):
+            if cancelled is not None and cancelled.is_set():
+                return
+            yield export_chunk(data, positions[i:i + EXPORT_CHUNK_ROWS], columns)
+
+    writers = {'csv': stream_csv, 'ndjson': stream_ndjson, 'arrow': stream_arrow, 'parquet': stream_parquet}
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    return Response(writers[export_format](chunks()), content_type=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=market_data.{extension}',
+        'X-Export-Rows': str(len(positions))
+    })
+
+
+def export_chunk(data, positions, columns):
+    """One slice of the export with dates rendered as YYYY-MM-DD"""
+    chunk = data.iloc[positions][columns]
+    if 'Arrival_Date' in chunk.columns:
+        chunk = chunk.assign(Arrival_Date=chunk['Arrival_Date'].dt.strftime('%Y-%m-%d'))
+    return chunk
+
+
+def stream_csv(chunks):
+    for i, chunk in enumerate(chunks):
+        yield chunk.to_csv(index=False, header=(i == 0))
+
+
+def stream_ndjson(chunks):
+    for chunk in chunks:
+        if len(chunk):
+            yield chunk.to_json(orient='records', lines=True, force_ascii=False) + '\n'
+
+
+def stream_arrow(chunks):
+    import pyarrow as pa
+
+    sink = BytesIO()
+    writer = None
+    for chunk in chunks:
+        batch = pa.RecordBatch.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pa.ipc.new_stream(sink, batch.schema)
+        writer.write_batch(batch)
+        yield drain(sink)
+    # No writer if the client went away before the first chunk
+    if writer is not None:
+        writer.close()
+        yield drain(sink)
+
+
+def stream_parquet(chunks):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = BytesIO()
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        # Each chunk becomes one row group, flushed to the client as soon as it is written
+        writer.write_table(table)
+        yield drain(sink)
+    # No writer if the client went away before the first chunk
+    if writer is not None:
+        writer.close()
+        yield drain(sink)
+
+
+def drain(buffer):
+    """Return and discard everything written to an in-memory sink so far"""
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+# Analytic endpoints that answer `Accept: application/vnd.apache.arrow.stream` with an Arrow
+# IPC stream of long-form columns instead of nested JSON
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+ARROW_ENDPOINTS = {'get_price_distribution', 'get_volatility_heatmap',
+                   'get_multi_commodity_comparison', 'get_price_details'}
+
+
+def wants_arrow():
+    """True when the client prefers Arrow over JSON and the server can produce it"""
+    if request.accept_mimetypes.best_match(['application/json', ARROW_MIME]) != ARROW_MIME:
+        return False
+    try:
+        import pyarrow
+    except ImportError:
+        return False
+    return True
+
+
+def arrow_response(columns, metadata=None):
+    """Serialise {name: NumPy array or Categorical} as a single-batch Arrow IPC stream.
+
+    Categoricals become dictionary-encoded columns; `metadata` values are stored as JSON
+    in the schema metadata.
+    """
+    import pyarrow as pa
+
+    with timed_phase('serialise'):
+        table = pa.table({name: pa.array(values) for name, values in columns.items()})
+        if metadata:
+            table = table.replace_schema_metadata({k: json.dumps(v) for k, v in metadata.items()})
+        sink = BytesIO()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        body = sink.getvalue()
+    return Response(body, content_type=ARROW_MIME)
+
+
+@app.after_request
+def vary_on_accept(response):
+    """Caches must key negotiated endpoints on Accept as well as the URL"""
+    if request.endpoint in ARROW_ENDPOINTS:
+        response.vary.add('Accept')
+    return response
 
 
 # ============================================
 # NEW API ENDPOINTS - PLAN0 IMPLEMENTATION
 # ============================================
 
+MONTH_NAMES = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+
+def monthly_grid(data, commodities):
+    """Modal-price sums and counts as dense (commodity x year x month) arrays in one pass.
+
+    Returns (years, sums, counts); rows of other commodities, or without a date or price,
+    are ignored.
+    """
+    codes = pd.Categorical(data['Commodity'], categories=list(dict.fromkeys(commodities))).codes
+    dates = data['Arrival_Date'].to_numpy().astype('datetime64[M]')
+    prices = data['Modal_Price'].to_numpy(dtype=np.float64)
+    keep = (codes >= 0) & ~np.isnat(dates) & ~np.isnan(prices)
+    codes, dates, prices = codes[keep], dates[keep].astype(np.int64), prices[keep]
+
+    years, year_index = np.unique(dates // 12, return_inverse=True)
+    shape = (len(dict.fromkeys(commodities)), len(years), 12)
+    cells = np.ravel_multi_index((codes, year_index.reshape(-1), dates % 12), shape)
+    size = shape[0] * shape[1] * shape[2]
+    sums = np.bincount(cells, weights=prices, minlength=size).reshape(shape)
+    counts = np.bincount(cells, minlength=size).reshape(shape)
+    return years + 1970, sums, counts
+
+
 @app.route('/api/year-over-year/<commodity>', methods=['GET'])
 def get_year_over_year(commodity):
-    """Get year-over-year price comparison by month"""
+    """Get year-over-year price comparison by month.
+
+    A comma-separated path (e.g. Onion,Tomato) returns {'commodities': [{name, years}]}.
+    """
+    commodities_list = [c.strip() for c in commodity.split(',') if c.strip()]
+    multiple = len(commodities_list) > 1
+    empty = {'commodities': []} if multiple else {'years': []}
     if df.empty:
-        return jsonify({'years': []})
+        return jsonify(empty)
     
     # Apply filters
     filtered_df = apply_filters(df)
     
     if filtered_df.empty:
-        return jsonify({'years': []})
-    
-    # Filter by commodity
-    commodity_df = filtered_df[filtered_df['Commodity'] == commodity].copy()
-    
-    if commodity_df.empty:
-        return jsonify({'years': []})
+        return jsonify(empty)
     
-    # Extract year and month
-    commodity_df['Year'] = commodity_df['Arrival_Date'].dt.year
-    commodity_df['Month'] = commodity_df['Arrival_Date'].dt.month
+    years, sums, counts = monthly_grid(filtered_df, commodities_list)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.round(sums / counts, 2)
     
-    # Group by year and month
-    yoy_data = commodity_df.groupby(['Year', 'Month'])['Modal_Price'].mean().reset_index()
-    
-    # Month names
-    month_names = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    
-    # Organize by year
-    years_data = []
-    for year in sorted(yoy_data['Year'].unique()):
-        year_df = yoy_data[yoy_data['Year'] == year]
-        # Sort by month to ensure correct order
-        year_df = year_df.sort_values('Month')
-        
-        # Create a dict for quick lookup
-        month_price_map = {int(row['Month']): round(float(row['Modal_Price']), 2) for _, row in year_df.iterrows()}
-        
-        # Pad with all 12 months
-        months = []
-        for month_num in range(1, 13):
-            months.append({
-                'month': month_names[month_num - 1],
-                'price': month_price_map.get(month_num, None)  # None for missing months
+    result = []
+    for c, name in enumerate(dict.fromkeys(commodities_list)):
+        years_data = []
+        for y in np.flatnonzero(counts[c].any(axis=1)):
+            years_data.append({
+                'year': str(years[y]),
+                # None for missing months
+                'months': [{'month': month, 'price': float(price) if n else None}
+                           for month, price, n in zip(MONTH_NAMES, means[c, y], counts[c, y])]
             })
-        
-        years_data.append({
-            'year': str(year),
-            'months': months
-        })
+        if years_data:
+            result.append({'name': name, 'years': years_data})
     
-    return jsonify({'years': years_data})
+    if multiple:
+        return jsonify({'commodities': result})
+    return jsonify({'years': result[0]['years'] if result else []})
 
 
 @app.route('/api/volatility-heatmap', methods=['GET'])
@@ -823,12 +2544,43 @@ def get_volatility_heatmap():
     """Get price volatility (std dev) grouped by commodity and market"""
     if df.empty:
         return jsonify({'commodities': [], 'markets': [], 'volatility': []})
-    
+
+    if 'window' in request.args and request.args.get('window', type=int) not in VOLATILITY_WINDOWS:
+        return jsonify({'error': f'window must be one of {list(VOLATILITY_WINDOWS)} days'}), 400
+
+    # JSON and Arrow requests share one grid, so coalesced followers get the same shape either way
+    grid = coalesced(compute_volatility_heatmap)
+    markets, commodities, matrix = grid['markets'], grid['commodities'], grid['matrix']
+    extra = {k: v for k, v in grid.items() if k in ('window', 'as_of')}
+    if wants_arrow():
+        return arrow_response({
+            'market': pd.Categorical(np.repeat(markets, len(commodities)), categories=markets),
+            'commodity': pd.Categorical(np.tile(commodities, len(markets)), categories=commodities),
+            'volatility': matrix.ravel()
+        }, extra)
+    return jsonify({
+        'commodities': commodities,
+        'markets': markets,
+        'volatility': [[round(float(v), 2) for v in row] for row in matrix],
+        **extra
+    })
+
+
+def compute_volatility_heatmap():
+    """Top-10 x top-10 (market, commodity) volatility for the current filters.
+
+    Returns the market and commodity labels and a (markets x commodities) NumPy matrix,
+    zero where a pair has no data; the response formats are built from it.
+    """
+    window = request.args.get('window', type=int)
+    if window is not None:
+        return windowed_volatility_heatmap(window)
+
     # Apply filters
     filtered_df = apply_filters(df)
     
     if filtered_df.empty:
-        return jsonify({'commodities': [], 'markets': [], 'volatility': []})
+        return {'commodities': [], 'markets': [], 'matrix': np.zeros((0, 0))}
     
     # Calculate volatility (standard deviation) by commodity and market
     volatility = filtered_df.groupby(['Commodity', 'Market'])['Modal_Price'].std().reset_index()
@@ -846,11 +2598,59 @@ def get_volatility_heatmap():
     volatility_matrix = volatility.pivot(index='Market', columns='Commodity', values='Volatility')
     volatility_matrix = volatility_matrix.fillna(0)
     
-    return jsonify({
+    return {
         'commodities': volatility_matrix.columns.tolist(),
         'markets': volatility_matrix.index.tolist(),
-        'volatility': [[round(float(v), 2) for v in row] for row in volatility_matrix.values]
-    })
+        'matrix': volatility_matrix.to_numpy(dtype=np.float64)
+    }
+
+
+def windowed_volatility_heatmap(window):
+    """Heatmap from precomputed rolling volatility as of end_date (default: latest arrival).
+
+    Each series contributes the rolling std at its last arrival on or before end_date;
+    series with no arrival inside the window, or before start_date, are left out.
+    """
+    index = series_index()
+    volatility = rolling_volatility(window)
+    days = index['days']
+    as_of = to_day(request.args['end_date']) if request.args.get('end_date') else int(days.max())
+    earliest = to_day(request.args['start_date']) if request.args.get('start_date') else None
+
+    candidates = np.flatnonzero(series_mask(index))
+    last = last_row_on_or_before(index, candidates, as_of)
+    last_days = days[np.maximum(last, 0)]
+    valid = (last >= 0) & (last_days > as_of - window)
+    if earliest is not None:
+        valid &= last_days >= earliest
+    candidates, last = candidates[valid], last[valid]
+    record_rows(len(index['starts']), len(candidates))
+
+    if len(candidates) == 0:
+        return {'commodities': [], 'markets': [], 'matrix': np.zeros((0, 0)), 'window': window,
+                'as_of': day_to_str(as_of)}
+
+    markets = index['markets'][candidates]
+    commodities = index['commodities'][candidates]
+    values = volatility[last]
+
+    top_commodities = sorted(top_n(commodities, values, 10))
+    top_markets = sorted(top_n(markets, values, 10))
+    commodity_pos = {c: j for j, c in enumerate(top_commodities)}
+    market_pos = {m: i for i, m in enumerate(top_markets)}
+
+    matrix = np.zeros((len(top_markets), len(top_commodities)))
+    for market, commodity, value in zip(markets, commodities, values):
+        if market in market_pos and commodity in commodity_pos:
+            matrix[market_pos[market], commodity_pos[commodity]] = value
+
+    return {
+        'commodities': top_commodities,
+        'markets': top_markets,
+        'matrix': matrix,
+        'window': window,
+        'as_of': day_to_str(as_of)
+    }
 
 
 @app.route('/api/seasonal-pattern/<commodity>', methods=['GET'])
@@ -873,22 +2673,18 @@ def get_seasonal_pattern(commodity):
         # Single commodity from path (backward compatible)
         commodities_list = [commodity]
     
+    # One grouped pass for every commodity; seasonal means pool all years
+    _, sums, counts = monthly_grid(filtered_df, commodities_list)
+    sums, counts = sums.sum(axis=1), counts.sum(axis=1)
+    
     result = []
-    for comm in commodities_list:
-        commodity_df = filtered_df[filtered_df['Commodity'] == comm].copy()
-        
-        if not commodity_df.empty:
-            # Extract month
-            commodity_df['Month'] = commodity_df['Arrival_Date'].dt.month
-            
-            # Group by month and calculate average price
-            seasonal_data = commodity_df.groupby('Month')['Modal_Price'].mean().reset_index()
-            seasonal_data = seasonal_data.sort_values('Month')
-            
+    for c, comm in enumerate(dict.fromkeys(commodities_list)):
+        months = np.flatnonzero(counts[c])
+        if len(months):
             result.append({
                 'name': comm,
-                'months': seasonal_data['Month'].tolist(),
-                'prices': [round(float(p), 2) for p in seasonal_data['Modal_Price'].tolist()]
+                'months': (months + 1).tolist(),
+                'prices': np.round(sums[c, months] / counts[c, months], 2).tolist()
             })
     
     # Backward compatibility: if single commodity, return old format
@@ -910,6 +2706,10 @@ def get_price_distribution():
     if df.empty:
         return jsonify({'commodities': []})
     
+    selection = sketch_selection() if approx_requested() else None
+    if selection is not None:
+        return jsonify(approx_price_distribution(*selection))
+
     # Apply filters
     filtered_df = apply_filters(df)
     
@@ -924,36 +2724,90 @@ def get_price_distribution():
         # Default to top 3 commodities
         commodities_list = filtered_df['Commodity'].value_counts().head(3).index.tolist()
     
+    if wants_arrow():
+        # One row per price, grouped by commodity in request order
+        selected = filtered_df[filtered_df['Commodity'].isin(commodities_list)].dropna(subset=['Modal_Price'])
+        commodity = pd.Categorical(selected['Commodity'], categories=list(dict.fromkeys(commodities_list)))
+        order = np.argsort(commodity.codes, kind='stable')
+        return arrow_response({
+            'commodity': commodity[order],
+            'price': np.round(selected['Modal_Price'].to_numpy(dtype=np.float64)[order], 2)
+        })
+
     # Get price arrays for each commodity
     result = []
     for commodity in commodities_list:
+        check_cancelled()
         commodity_df = filtered_df[filtered_df['Commodity'] == commodity]
         if not commodity_df.empty:
-            prices = commodity_df['Modal_Price'].dropna().tolist()
-            if prices:
+            # Rounded the same way as the Arrow branch and the approximate path
+            prices = np.round(commodity_df['Modal_Price'].dropna().to_numpy(dtype=np.float64), 2)
+            if len(prices):
                 result.append({
                     'name': commodity,
-                    'prices': [round(float(p), 2) for p in prices]
+                    'prices': prices.tolist()
                 })
     
     return jsonify({'commodities': result})
 
 
+def approx_price_distribution(selected, approx):
+    """Violin data from the sketches: a uniform sample of prices plus sketched quantiles per commodity"""
+    sketch = sketches()
+    labels = sketch['commodities']
+    commodities_param = request.args.get('commodities', '')
+    if commodities_param:
+        commodities_list = [c.strip() for c in commodities_param.split(',')]
+    else:
+        counts = np.bincount(sketch['commodity'][selected & (sketch['commodity'] >= 0)],
+                             weights=sketch['price_count'][selected & (sketch['commodity'] >= 0)],
+                             minlength=len(labels))
+        commodities_list = [labels[i] for i in np.argsort(-counts, kind='stable')[:3] if counts[i] > 0]
+
+    result = []
+    for commodity in commodities_list:
+        code = labels.get_indexer([commodity])[0]
+        in_commodity = selected & (sketch['commodity'] == code)
+        if code < 0 or not sketch['price_count'][in_commodity].any():
+            continue
+        keys, prices = entries_for(sketch['sample'], in_commodity)
+        sample = prices[np.argsort(keys, kind='stable')[:SKETCH_SAMPLE_SIZE]]
+        bins, counts = entries_for(sketch['bins'], in_commodity)
+        merged = np.bincount(bins, weights=counts)
+        result.append({
+            'name': commodity,
+            'prices': np.round(sample, 2).tolist(),
+            'count': int(sketch['price_count'][in_commodity].sum()),
+            'quantiles': {str(q): round(float(v), 2)
+                          for q, v in zip(DISTRIBUTION_QUANTILES, bin_quantiles(merged, DISTRIBUTION_QUANTILES))}
+        })
+
+    approx['sample_size'] = SKETCH_SAMPLE_SIZE
+    approx['errors'] = {'quantiles': {'relative_error': QUANTILE_ACCURACY}}
+    return {'commodities': result, 'approx': approx}
+
+
 @app.route('/api/market-performance', methods=['GET'])
 def get_market_performance():
     """Get market performance metrics"""
     if df.empty:
         return jsonify([])
-    
+
+    return jsonify(coalesced(compute_market_performance))
+
+
+def compute_market_performance():
+    """Per-market price, volatility, coverage and freshness metrics for the current filters"""
     # Apply filters
     filtered_df = apply_filters(df)
     
     if filtered_df.empty:
-        return jsonify([])
+        return []
     
     # Calculate metrics for each market
     performance = []
     for market in filtered_df['Market'].unique():
+        check_cancelled()
         market_df = filtered_df[filtered_df['Market'] == market]
         
         # Calculate metrics
@@ -978,7 +2832,7 @@ def get_market_performance():
     # Sort by a composite score (lower volatility, more commodities, fresher data)
     performance.sort(key=lambda x: (-x['commodities'], -x['avg_price'], x['volatility']), reverse=False)
     
-    return jsonify(performance)
+    return performance
 
 
 @app.route('/api/data-quality', methods=['GET'])
@@ -992,39 +2846,108 @@ def get_data_quality():
             'missing_days': 0
         })
     
-    # Apply filters
-    filtered_df = apply_filters(df)
+    selection = sketch_selection() if approx_requested() else None
+    if selection is not None:
+        return jsonify(approx_data_quality(*selection))
+
+    check_cancelled()
+    with timed_phase('filter'):
+        days = arrival_days()[filter_mask(df)]
+    record_rows(len(df), len(days))
+    days = days[days != np.iinfo(np.int64).min]
     
-    if filtered_df.empty:
+    if len(days) == 0:
         return jsonify({
             'total_records': 0,
             'date_range': {'min': None, 'max': None},
             'completeness': 0,
-            'missing_days': 0
+            'missing_days': 0,
+            **series_quality_report(request.args.get('worst', 10, type=int))
         })
     
     # Calculate statistics
-    total_records = len(filtered_df)
-    min_date = filtered_df['Arrival_Date'].min()
-    max_date = filtered_df['Arrival_Date'].max()
+    total_records = len(days)
+    min_day, max_day = int(days.min()), int(days.max())
     
     # Calculate completeness (days with data / total days in range)
-    total_days = (max_date - min_date).days + 1
-    unique_days = filtered_df['Arrival_Date'].dt.date.nunique()
-    completeness = (unique_days / total_days * 100) if total_days > 0 else 0
+    total_days = max_day - min_day + 1
+    unique_days = int(np.count_nonzero(np.bincount(days - min_day)))
+    completeness = unique_days / total_days * 100
     missing_days = total_days - unique_days
     
     return jsonify({
         'total_records': int(total_records),
         'date_range': {
-            'min': min_date.strftime('%Y-%m-%d'),
-            'max': max_date.strftime('%Y-%m-%d')
+            'min': day_to_str(min_day),
+            'max': day_to_str(max_day)
         },
         'completeness': round(float(completeness), 2),
-        'missing_days': int(missing_days)
+        'missing_days': int(missing_days),
+        **series_quality_report(request.args.get('worst', 10, type=int))
     })
 
 
+def series_quality_report(worst):
+    """Summary and the `worst` least healthy series matching the states/markets/commodities filters.
+
+    Series are ranked stale first, then by lowest coverage, then by longest gap; their
+    statistics cover each series' full history.
+    """
+    quality = series_quality()
+    selected = np.flatnonzero(series_mask(quality))
+    ranked = selected[np.lexsort((-quality['longest_gap'][selected], quality['coverage'][selected],
+                                  ~quality['stale'][selected]))][:min(max(worst, 0), MAX_PAGE_SIZE)]
+    return {
+        'series': {
+            'count': len(selected),
+            'stale': int(np.count_nonzero(quality['stale'][selected])),
+            'stale_after_days': STALE_SERIES_DAYS,
+            'duplicate_rows': int(quality['duplicate_rows'][selected].sum()),
+            'median_coverage': round(float(np.median(quality['coverage'][selected])) * 100, 2) if len(selected) else None
+        },
+        'worst_series': [{
+            'market': quality['markets'][i],
+            'commodity': quality['commodities'][i],
+            'state': quality['states'][i] if pd.notna(quality['states'][i]) else None,
+            'rows': int(quality['rows'][i]),
+            'first_date': day_to_str(quality['first_day'][i]),
+            'last_date': day_to_str(quality['last_day'][i]),
+            'coverage': round(float(quality['coverage'][i]) * 100, 2),
+            'longest_gap': int(quality['longest_gap'][i]),
+            'duplicate_rows': int(quality['duplicate_rows'][i]),
+            'stale': bool(quality['stale'][i])
+        } for i in ranked]
+    }
+
+
+def approx_data_quality(selected, approx):
+    """Data-quality statistics from partition totals and day-of-month bitmasks"""
+    sketch = sketches()
+    approx['errors'] = {'total_records': {'max_overcount': approx['boundary_records']}}
+    dated = selected & (sketch['month'] >= 0)
+    if not sketch['rows'][selected].sum() or not dated.any():
+        return {'total_records': int(sketch['rows'][selected].sum()), 'date_range': {'min': None, 'max': None},
+                'completeness': 0, 'missing_days': 0, 'approx': approx,
+                **series_quality_report(request.args.get('worst', 10, type=int))}
+
+    # Days with data: OR the bitmasks of each month together, then count bits
+    months, month_index = np.unique(sketch['month'][dated], return_inverse=True)
+    bits = np.zeros(len(months), dtype=np.uint32)
+    np.bitwise_or.at(bits, month_index, sketch['day_bits'][dated])
+    unique_days = int(popcount32(bits).sum())
+    min_day, max_day = int(sketch['first_day'][dated].min()), int(sketch['last_day'][dated].max())
+    total_days = max_day - min_day + 1
+    return {
+        'total_records': int(sketch['rows'][selected].sum()),
+        'date_range': {'min': day_to_str(min_day), 'max': day_to_str(max_day)},
+        'completeness': round(unique_days / total_days * 100, 2),
+        'missing_days': total_days - unique_days,
+        'approx': approx,
+        # Per-series health comes from the precomputed series summary, so it is exact either way
+        **series_quality_report(request.args.get('worst', 10, type=int))
+    }
+
+
 @app.route('/api/comparison-commodities', methods=['GET'])
 def get_comparison_commodities():
     """Get list of commodities that have sufficient data for comparison"""
@@ -1069,15 +2992,27 @@ def get_multi_commodity_comparison():
     else:
         commodities_list = filtered_df['Commodity'].value_counts().head(4).index.tolist()
     
+    max_points = max_points_arg()
+    arrow = wants_arrow()
+
     # Get time-series data for each commodity
     result = []
+    series = []
     for commodity in commodities_list:
+        check_cancelled()
         commodity_df = filtered_df[filtered_df['Commodity'] == commodity].copy()
         if not commodity_df.empty:
             # Group by month for cleaner visualization
             commodity_df['YearMonth'] = commodity_df['Arrival_Date'].dt.to_period('M')
             monthly_data = commodity_df.groupby('YearMonth')['Modal_Price'].mean().reset_index()
             monthly_data['YearMonth'] = monthly_data['YearMonth'].dt.to_timestamp()
+            if max_points:
+                monthly_data = monthly_data.iloc[lttb_indices(
+                    monthly_data['YearMonth'].to_numpy().astype('datetime64[D]').astype(np.float64),
+                    monthly_data['Modal_Price'].to_numpy(dtype=np.float64), max_points)]
+            series.append((commodity, monthly_data))
+            if arrow:
+                continue
             
             data_points = []
             for _, row in monthly_data.iterrows():
@@ -1092,14 +3027,176 @@ def get_multi_commodity_comparison():
                     'data': data_points
                 })
     
+    if arrow:
+        series = [(c, m) for c, m in series if not m.empty]
+        names = [c for c, _ in series]
+        return arrow_response({
+            'commodity': pd.Categorical(np.repeat(names, [len(m) for _, m in series]), categories=names),
+            'date': np.concatenate([m['YearMonth'].to_numpy().astype('datetime64[D]') for _, m in series]
+                                   or [np.array([], dtype='datetime64[D]')]),
+            'price': np.round(np.concatenate([m['Modal_Price'].to_numpy(dtype=np.float64) for _, m in series]
+                                             or [np.array([])]), 2)
+        })
     return jsonify({'commodities': result})
 
 
+# Default trailing window for /api/market-spread when no start_date is given
+DEFAULT_SPREAD_WINDOW_DAYS = 365
+# Market pairs sharing fewer arrival days than this get no spread/correlation
+MIN_SPREAD_OVERLAP = 10
+
+
+@app.route('/api/market-spread/<commodity>', methods=['GET'])
+def get_market_spread(commodity):
+    """Pairwise cross-market price spread and correlation for one commodity.
+
+    Uses the days in [start_date, end_date] (default: the last DEFAULT_SPREAD_WINDOW_DAYS
+    up to the latest arrival) and the states/markets filters. mean_spread[i][j] is the
+    average of price(i) - price(j) over the days both markets traded.
+    """
+    if df.empty:
+        return jsonify({'error': 'No market data available'}), 404
+
+    check_cancelled()
+    prices = market_price_matrix(commodity)
+    if prices is None:
+        return jsonify({'error': f'No data for commodity: {commodity}'}), 404
+
+    matrix, first_day = prices['matrix'], prices['first_day']
+    last_day = first_day + matrix.shape[1] - 1
+    end = min(to_day(request.args['end_date']), last_day) if request.args.get('end_date') else last_day
+    start = (max(to_day(request.args['start_date']), first_day) if request.args.get('start_date')
+             else max(end - DEFAULT_SPREAD_WINDOW_DAYS + 1, first_day))
+    selected = np.ones(len(prices['markets']), dtype=bool)
+    for param, key in (('states', 'states'), ('markets', 'markets')):
+        values = filter_values(param)
+        if values:
+            selected &= np.isin(prices[key], values)
+
+    window = matrix[selected, max(start - first_day, 0):max(end - first_day + 1, 0)]
+    markets = prices['markets'][selected]
+    record_rows(matrix.size, window.size)
+
+    # Pairwise sums over days both markets traded, all as matrix products
+    traded = ~np.isnan(window)
+    x = np.where(traded, window, 0.0)
+    v = traded.astype(np.float64)
+    overlap = v @ v.T
+    sum_i, sum_j = x @ v.T, v @ x.T
+    sq_i, sq_j = (x * x) @ v.T, v @ (x * x).T
+    cross = x @ x.T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_spread = (sum_i - sum_j) / overlap
+        spread_var = (sq_i - 2 * cross + sq_j) / overlap - mean_spread ** 2
+        spread_std = np.sqrt(np.maximum(spread_var, 0) * overlap / (overlap - 1))
+        correlation = ((overlap * cross - sum_i * sum_j) /
+                       np.sqrt((overlap * sq_i - sum_i ** 2) * (overlap * sq_j - sum_j ** 2)))
+    sparse = overlap < MIN_SPREAD_OVERLAP
+
+    def cells(values, digits):
+        values = np.where(sparse | ~np.isfinite(values), np.nan, np.round(values, digits))
+        return [[None if np.isnan(v) else float(v) for v in row] for row in values]
+
+    observations = traded.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_price = np.round(x.sum(axis=1) / observations, 2)
+
+    return jsonify({
+        'commodity': commodity,
+        'start_date': day_to_str(start),
+        'end_date': day_to_str(end),
+        'markets': markets.tolist(),
+        'observations': observations.tolist(),
+        'mean_price': [None if n == 0 else float(p) for p, n in zip(mean_price, observations)],
+        'overlap_days': overlap.astype(np.int64).tolist(),
+        'mean_spread': cells(mean_spread, 2),
+        'spread_std': cells(spread_std, 2),
+        'correlation': cells(correlation, 4)
+    })
+
+
+# Default look-back for /api/anomalies when no start_date is given
+ANOMALY_RECENT_DAYS = 90
+
+
+@app.route('/api/anomalies', methods=['GET'])
+def get_anomalies():
+    """Top-k price anomalies (largest |robust z| first) for the filters.
+
+    Without start_date only the last ANOMALY_RECENT_DAYS up to end_date (default: the
+    latest arrival) are considered; ?k= sets how many are returned (default 20).
+    """
+    if df.empty:
+        return jsonify({'anomalies': [], 'total': 0})
+
+    check_cancelled()
+    index = series_index()
+    anomalies = anomaly_index()
+    k = min(max(request.args.get('k', 20, type=int), 1), MAX_PAGE_SIZE)
+    end = to_day(request.args['end_date']) if request.args.get('end_date') else int(index['days'].max())
+    start = (to_day(request.args['start_date']) if request.args.get('start_date')
+             else end - ANOMALY_RECENT_DAYS + 1)
+
+    # The index is already ordered by |z|, so the first k matches are the top k
+    with timed_phase('filter'):
+        matches = np.flatnonzero(series_mask(index)[anomalies['series']] &
+                                 (anomalies['days'] >= start) & (anomalies['days'] <= end))
+    record_rows(len(anomalies['z']), min(len(matches), k))
+
+    result = []
+    for i in matches[:k]:
+        series = anomalies['series'][i]
+        result.append({
+            'market': index['markets'][series],
+            'commodity': index['commodities'][series],
+            'state': index['states'][series] if pd.notna(index['states'][series]) else None,
+            'date': day_to_str(anomalies['days'][i]),
+            'price': round(float(anomalies['price'][i]), 2),
+            'median': round(float(anomalies['median'][i]), 2),
+            'z': round(float(anomalies['z'][i]), 2),
+            'direction': 'spike' if anomalies['z'][i] > 0 else 'drop'
+        })
+
+    return jsonify({
+        'anomalies': result,
+        'total': int(len(matches)),
+        'start_date': day_to_str(start),
+        'end_date': day_to_str(end),
+        'window': ANOMALY_WINDOW,
+        'threshold': ANOMALY_Z_THRESHOLD
+    })
+
+
+def warm_derived_data():
+    """Build the per-series structures at load so the first requests are served from them"""
+    if df.empty:
+        return
+    started = time.perf_counter()
+    ohlc_rollups()
+    sketches()
+    series_quality()
+    anomaly_index()
+    for window in VOLATILITY_WINDOWS:
+        rolling_volatility(window)
+    print(f"✓ Derived series data built in {time.perf_counter() - started:.2f}s")
+
+
+# Off by default: on serverless every cold start would pay for the warm-up before its first
+# response. Long-running servers warm up from __main__ and the ASGI lifespan instead.
+if os.environ.get('PRECOMPUTE_ON_LOAD', '0') == '1':
+    warm_derived_data()
+
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
 
 
+@app.errorhandler(RequestCancelled)
+def request_cancelled_error(error):
+    return jsonify({'error': 'Request cancelled'}), 503
+
+
 @app.errorhandler(500)
 def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
@@ -1111,6 +3208,7 @@ if __name__ == '__main__':
     print("="*60)
     print(f"📊 Market records loaded: {len(df)}")
     print(f"🔮 Forecast commodities: {len(MODEL_COMMODITIES)}")
+    warm_derived_data()
     print("="*60)
     print("🚀 Starting server on http://localhost:5000")
     print("="*60 + "\n")
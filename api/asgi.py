@@ -0,0 +1,340 @@
+"""
+ASGI entry point for the Agricultural Market Dashboard API
+Serves the Flask app from an event loop: cheap catalogue lookups run inline,
+the filter dropdown lists on a small pool of their own, and heavy pandas
+aggregations on a bounded thread pool with per-endpoint concurrency limits,
+queue-depth load shedding and request deadlines.
+
+Run with:  cd api && uvicorn asgi:app --port 5000
+URLs and JSON bodies are identical to the WSGI app in app.py.
+"""
+
+import asyncio
+import io
+import math
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import app as flask_app, CANCEL_EVENT_KEY, warm_derived_data
+
+# Worker threads for pandas work (pandas releases the GIL in most heavy kernels)
+COMPUTE_WORKERS = int(os.environ.get('COMPUTE_WORKERS', str(min(8, (os.cpu_count() or 2) * 2))))
+# Jobs submitted to the compute pool but not yet started beyond this are rejected with 429,
+# as is admitted work (queued, running or waiting for an endpoint slot) beyond workers + depth
+MAX_QUEUE_DEPTH = int(os.environ.get('MAX_QUEUE_DEPTH', str(COMPUTE_WORKERS * 4)))
+# Threads reserved for the state/market/commodity lists, so heavy work never starves them
+CATALOGUE_WORKERS = int(os.environ.get('CATALOGUE_WORKERS', '2'))
+# Work still unfinished after this many seconds is abandoned with 504
+REQUEST_DEADLINE_SECONDS = float(os.environ.get('REQUEST_DEADLINE_SECONDS', '30'))
+# Default number of concurrent computations allowed per endpoint
+DEFAULT_ENDPOINT_CONCURRENCY = int(os.environ.get('DEFAULT_ENDPOINT_CONCURRENCY', '4'))
+
+# Endpoints answered from in-memory catalogues without touching the full dataframe
+INLINE_ENDPOINTS = {
+    'health', 'version', 'metrics', 'profiles', 'model-commodities', 'prediction-markets',
+    'prediction-commodities',
+}
+# Filter dropdown lists: short dataframe scans run on their own pool, outside admission control
+CATALOGUE_ENDPOINTS = {'states', 'commodities', 'markets'}
+
+
+def parse_endpoint_limits(spec):
+    """Parse 'volatility-heatmap=2,price-details=3' into {endpoint: limit}"""
+    limits = {}
+    for item in spec.split(','):
+        if '=' in item:
+            name, value = item.split('=', 1)
+            limits[name.strip()] = int(value)
+    return limits
+
+
+ENDPOINT_CONCURRENCY = parse_endpoint_limits(os.environ.get(
+    'ENDPOINT_CONCURRENCY',
+    'volatility-heatmap=2,price-details=2,market-performance=2,price-distribution=2,'
+    'multi-commodity-comparison=2'
+))
+
+
+def endpoint_name(path):
+    """First path segment after /api/, e.g. /api/forecast-data/Onion -> forecast-data"""
+    parts = path.strip('/').split('/')
+    if len(parts) >= 2 and parts[0] == 'api':
+        return parts[1]
+    return ''
+
+
+class ComputeGate:
+    """Admission control in front of the compute executor"""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=COMPUTE_WORKERS, thread_name_prefix='compute')
+        self.catalogue_executor = ThreadPoolExecutor(max_workers=CATALOGUE_WORKERS, thread_name_prefix='catalogue')
+        self.semaphores = {}
+        # Requests between admission and release of their endpoint slot (event loop only)
+        self.admitted = 0
+        # Jobs submitted to the executor that no worker has picked up yet
+        self.queued = 0
+        self.queued_lock = threading.Lock()
+        # Exponentially weighted mean service time, used for Retry-After
+        self.mean_service = 0.1
+
+    def semaphore(self, name):
+        sem = self.semaphores.get(name)
+        if sem is None:
+            sem = self.semaphores[name] = asyncio.Semaphore(
+                ENDPOINT_CONCURRENCY.get(name, DEFAULT_ENDPOINT_CONCURRENCY))
+        return sem
+
+    def overloaded(self):
+        return self.queued >= MAX_QUEUE_DEPTH or self.admitted >= COMPUTE_WORKERS + MAX_QUEUE_DEPTH
+
+    def dequeue(self):
+        with self.queued_lock:
+            self.queued -= 1
+
+    def submit(self, fn, *args):
+        """executor.submit() that counts the job as queued until a worker starts it"""
+        def started():
+            self.dequeue()
+            return fn(*args)
+
+        with self.queued_lock:
+            self.queued += 1
+        job = self.executor.submit(started)
+        # A job cancelled before it started never runs started()
+        job.add_done_callback(lambda j: j.cancelled() and self.dequeue())
+        return job
+
+    def retry_after(self):
+        """Seconds until the current backlog should have drained"""
+        return max(1, math.ceil(max(self.queued, 1) * self.mean_service / COMPUTE_WORKERS))
+
+    def observe(self, seconds):
+        self.mean_service = 0.8 * self.mean_service + 0.2 * seconds
+
+
+gate = None
+
+
+def build_environ(scope, body, cancelled):
+    """Translate an ASGI HTTP scope into a WSGI environ"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        CANCEL_EVENT_KEY: cancelled,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+def call_wsgi(environ):
+    """Run the Flask app and return (status, headers, body iterator)"""
+    captured = {}
+
+    def start_response(status, headers, exc_info=None):
+        captured['status'] = int(status.split(' ', 1)[0])
+        captured['headers'] = [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in headers]
+
+    result = flask_app(environ, start_response)
+    return captured['status'], captured['headers'], result
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def send_json_error(send, status, message, extra_headers=()):
+    body = ('{"error": "%s"}' % message).encode('utf-8')
+    headers = [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]
+    headers.extend(extra_headers)
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def send_wsgi_result(send, status, headers, result, run):
+    """Stream a WSGI body iterator to the client, pulling each chunk through `run`"""
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    iterator = iter(result)
+    try:
+        while True:
+            chunk = await run(next, iterator, None)
+            if chunk is None:
+                break
+            if chunk:
+                await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+    finally:
+        if hasattr(result, 'close'):
+            await run(result.close)
+    await send({'type': 'http.response.body', 'body': b''})
+
+
+async def watch_disconnect(receive, cancelled):
+    """Flag the request as abandoned as soon as the client goes away"""
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            cancelled.set()
+            return
+
+
+async def handle_inline(scope, body, send):
+    environ = build_environ(scope, body, threading.Event())
+
+    async def run(fn, *args):
+        return fn(*args)
+
+    status, headers, result = call_wsgi(environ)
+    await send_wsgi_result(send, status, headers, result, run)
+
+
+async def handle_catalogue(scope, body, send):
+    loop = asyncio.get_running_loop()
+    environ = build_environ(scope, body, threading.Event())
+
+    async def run(fn, *args):
+        return await loop.run_in_executor(gate.catalogue_executor, fn, *args)
+
+    status, headers, result = await run(call_wsgi, environ)
+    await send_wsgi_result(send, status, headers, result, run)
+
+
+async def handle_compute(scope, body, receive, send, name):
+    loop = asyncio.get_running_loop()
+    if gate.overloaded():
+        await send_json_error(send, 429, 'Server busy, retry later',
+                              [(b'retry-after', str(gate.retry_after()).encode())])
+        return
+
+    cancelled = threading.Event()
+    environ = build_environ(scope, body, cancelled)
+    watcher = asyncio.ensure_future(watch_disconnect(receive, cancelled))
+    deadline = loop.time() + REQUEST_DEADLINE_SECONDS
+    semaphore = gate.semaphore(name)
+
+    def release():
+        semaphore.release()
+        gate.admitted -= 1
+
+    async def run(fn, *args):
+        return await asyncio.wrap_future(gate.submit(fn, *args))
+
+    gate.admitted += 1
+    try:
+        try:
+            await asyncio.wait_for(semaphore.acquire(), timeout=REQUEST_DEADLINE_SECONDS)
+        except BaseException as e:
+            gate.admitted -= 1
+            if not isinstance(e, asyncio.TimeoutError):
+                raise
+            cancelled.set()
+            await send_json_error(send, 504, 'Request deadline exceeded')
+            return
+
+        started = time.perf_counter()
+        job = gate.submit(call_wsgi, environ)
+        try:
+            try:
+                status, headers, result = await asyncio.wait_for(
+                    asyncio.shield(asyncio.wrap_future(job)), timeout=max(deadline - loop.time(), 0))
+            except BaseException:
+                # A queued job is dropped; a running one stops at its next check_cancelled().
+                # cancel() cannot stop a running thread, so its slot is only freed once it returns
+                cancelled.set()
+                job.cancel()
+                job.add_done_callback(lambda _: loop.call_soon_threadsafe(release))
+                raise
+        except asyncio.TimeoutError:
+            await send_json_error(send, 504, 'Request deadline exceeded')
+            return
+
+        try:
+            gate.observe(time.perf_counter() - started)
+            if cancelled.is_set():
+                if hasattr(result, 'close'):
+                    await run(result.close)
+                return
+            await send_wsgi_result(send, status, headers, result, run)
+        finally:
+            release()
+    finally:
+        watcher.cancel()
+
+
+async def lifespan(receive, send):
+    global gate
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            gate = ComputeGate()
+            # Build the derived structures before accepting traffic, off the event loop
+            await asyncio.get_running_loop().run_in_executor(gate.executor, warm_derived_data)
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            gate.executor.shutdown(wait=False, cancel_futures=True)
+            gate.catalogue_executor.shutdown(wait=False, cancel_futures=True)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def app(scope, receive, send):
+    global gate
+    if scope['type'] == 'lifespan':
+        await lifespan(receive, send)
+        return
+    if scope['type'] != 'http':
+        return
+    if gate is None:
+        # Servers that skip the lifespan protocol
+        gate = ComputeGate()
+
+    body = await read_body(receive)
+    if body is None:
+        return
+
+    name = endpoint_name(scope['path'])
+    if name in INLINE_ENDPOINTS or scope['method'] == 'OPTIONS':
+        await handle_inline(scope, body, send)
+    elif name in CATALOGUE_ENDPOINTS:
+        await handle_catalogue(scope, body, send)
+    else:
+        await handle_compute(scope, body, receive, send, name)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    print(f"🚀 Starting ASGI server on http://localhost:5000 ({COMPUTE_WORKERS} compute workers)")
+    uvicorn.run(app, host='0.0.0.0', port=5000)
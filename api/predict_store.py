@@ -0,0 +1,267 @@
+"""
+Forecast refresh pipeline for the Agricultural Market Dashboard
+Fits one lightweight seasonal model per (Market, Commodity) series across a
+process pool and writes the results into predictions.db/predicted_prices.
+
+Only series whose history gained new Arrival_Date rows since the last run are
+refitted; run state is kept in the forecast_runs table next to the forecasts.
+
+Usage:  python api/predict_store.py [--full] [--horizon 180] [--workers 4]
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+DB_PATH = os.path.join(os.path.dirname(__file__), 'DB', 'data.db')
+PREDICTIONS_DB_PATH = os.path.join(os.path.dirname(__file__), 'DB', 'predictions.db')
+
+# Fourier orders for the yearly and weekly seasonal terms
+YEARLY_ORDER = 3
+WEEKLY_ORDER = 3
+# Ridge penalty on the seasonal coefficients; keeps short or gappy series stable
+SEASONAL_PENALTY = 1.0
+# Series with fewer distinct arrival days than this are not forecast
+MIN_HISTORY_DAYS = 30
+# Trailing days held out to measure out-of-sample residuals for prediction intervals
+BACKTEST_DAYS = 90
+MIN_BACKTEST_RESIDUALS = 10
+# Central interval coverages stored in forecast_intervals (read by app.py)
+INTERVAL_LEVELS = (0.5, 0.8, 0.95)
+
+
+def fourier_terms(days, period, order):
+    """sin/cos columns for a period given in days"""
+    phase = 2 * np.pi * np.asarray(days, dtype=np.float64)[:, None] / period
+    k = np.arange(1, order + 1)[None, :]
+    return np.hstack([np.sin(k * phase), np.cos(k * phase)])
+
+
+def design_matrix(days, day0, yearly, weekly):
+    """Columns: intercept, linear trend (years), yearly Fourier, weekly Fourier"""
+    t = (np.asarray(days, dtype=np.float64) - day0) / 365.25
+    blocks = [np.ones((len(t), 1)), t[:, None]]
+    if yearly:
+        blocks.append(fourier_terms(days, 365.25, YEARLY_ORDER))
+    if weekly:
+        blocks.append(fourier_terms(days, 7.0, WEEKLY_ORDER))
+    return np.hstack(blocks)
+
+
+def fit_model(days, values):
+    """Least-squares fit of trend + seasonal terms; returns the model tuple used by predict_components"""
+    day0 = days[0]
+    # Seasonal terms are only identifiable once the history covers their period
+    yearly = days[-1] - day0 >= 365
+    weekly = len(days) >= 14
+    X = design_matrix(days, day0, yearly, weekly)
+
+    penalty = np.full(X.shape[1], SEASONAL_PENALTY)
+    penalty[:2] = 0.0
+    beta = np.linalg.solve(X.T @ X + np.diag(penalty), X.T @ values)
+    return beta, day0, yearly, weekly
+
+
+def predict_components(model, days):
+    """(trend, season_yearly, season_weekly) arrays for the given days"""
+    beta, day0, yearly, weekly = model
+    F = design_matrix(days, day0, yearly, weekly)
+    trend = F[:, :2] @ beta[:2]
+    col = 2
+    season_yearly = np.zeros(len(days))
+    if yearly:
+        width = 2 * YEARLY_ORDER
+        season_yearly = F[:, col:col + width] @ beta[col:col + width]
+        col += width
+    season_weekly = np.zeros(len(days))
+    if weekly:
+        width = 2 * WEEKLY_ORDER
+        season_weekly = F[:, col:col + width] @ beta[col:col + width]
+    return trend, season_yearly, season_weekly
+
+
+def backtest_intervals(days, daily):
+    """Relative residual quantiles from refitting without the last BACKTEST_DAYS of history.
+
+    Returns [(level, lower, upper, n_residuals)] where a forecast p has interval
+    p * (1 + lower) .. p * (1 + upper); empty if the series is too short to hold out.
+    """
+    held_out = days > days[-1] - BACKTEST_DAYS
+    if (~held_out).sum() < MIN_HISTORY_DAYS or held_out.sum() < MIN_BACKTEST_RESIDUALS:
+        return []
+    model = fit_model(days[~held_out], daily[~held_out])
+    predicted = sum(predict_components(model, days[held_out]))
+    usable = predicted > 0
+    if usable.sum() < MIN_BACKTEST_RESIDUALS:
+        return []
+    residuals = daily[held_out][usable] / predicted[usable] - 1.0
+    return [(level, float(np.quantile(residuals, (1 - level) / 2)),
+             float(np.quantile(residuals, 1 - (1 - level) / 2)), int(usable.sum()))
+            for level in INTERVAL_LEVELS]
+
+
+def fit_series(task):
+    """Fit trend + yearly + weekly seasonality to one series and forecast `horizon` days ahead.
+
+    `task` is (market, commodity, days, prices, horizon) with days as days since epoch.
+    Returns (market, commodity, rows, intervals, fit_seconds) where rows are
+    (ds, Predicted_Price, trend, season_yearly, season_weekly) tuples and intervals
+    come from backtest_intervals().
+    """
+    market, commodity, days, prices, horizon = task
+    started = time.perf_counter()
+
+    # Average multiple arrivals (varieties, grades) on the same day
+    unique_days, inverse = np.unique(days, return_inverse=True)
+    daily = np.bincount(inverse, weights=prices) / np.bincount(inverse)
+
+    model = fit_model(unique_days, daily)
+    future = np.arange(unique_days[-1] + 1, unique_days[-1] + 1 + horizon)
+    trend, season_yearly, season_weekly = predict_components(model, future)
+    # Prices cannot go negative, even when a falling trend is extrapolated
+    predicted = np.maximum(trend + season_yearly + season_weekly, 0.0)
+    intervals = backtest_intervals(unique_days, daily)
+
+    ds = np.datetime_as_string(future.astype('datetime64[D]'))
+    rows = list(zip(ds.tolist(), np.round(predicted, 4).tolist(), np.round(trend, 4).tolist(),
+                    np.round(season_yearly, 4).tolist(), np.round(season_weekly, 4).tolist()))
+    return market, commodity, rows, intervals, time.perf_counter() - started
+
+
+def load_history(data_db):
+    """All modal prices as a date-sorted frame with integer day ordinals"""
+    conn = sqlite3.connect(data_db)
+    history = pd.read_sql_query(
+        "SELECT Market, Commodity, Arrival_Date, Modal_Price FROM market_data", conn)
+    conn.close()
+    history['Arrival_Date'] = pd.to_datetime(history['Arrival_Date'])
+    history = history.dropna().sort_values(['Market', 'Commodity', 'Arrival_Date'], kind='mergesort')
+    history['day'] = history['Arrival_Date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    return history
+
+
+def ensure_schema(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS predicted_prices (
+            ds TEXT, Market TEXT, Commodity TEXT, Predicted_Price REAL,
+            trend REAL, season_yearly REAL, season_weekly REAL
+        )""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_predicted_series ON predicted_prices (Market, Commodity)")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS forecast_runs (
+            Market TEXT, Commodity TEXT, last_arrival_date TEXT, history_rows INTEGER,
+            fitted_at TEXT, fit_seconds REAL, PRIMARY KEY (Market, Commodity)
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS forecast_intervals (
+            Market TEXT, Commodity TEXT, level REAL, lower REAL, upper REAL, residuals INTEGER,
+            PRIMARY KEY (Market, Commodity, level)
+        )""")
+    conn.commit()
+
+
+def stale_series(history, conn, full):
+    """Series whose latest Arrival_Date or row count changed since they were last fitted"""
+    summary = history.groupby(['Market', 'Commodity']).agg(
+        last_day=('day', 'max'), rows=('day', 'size'), distinct_days=('day', 'nunique')).reset_index()
+    summary = summary[summary['distinct_days'] >= MIN_HISTORY_DAYS]
+    if full:
+        return summary
+
+    runs = pd.read_sql_query("SELECT Market, Commodity, last_arrival_date, history_rows FROM forecast_runs", conn)
+    runs['last_day'] = pd.to_datetime(runs['last_arrival_date']).to_numpy().astype('datetime64[D]').astype(np.int64)
+    merged = summary.merge(runs[['Market', 'Commodity', 'last_day', 'history_rows']],
+                           on=['Market', 'Commodity'], how='left', suffixes=('', '_fitted'))
+    changed = (merged['last_day_fitted'].isna()
+               | (merged['last_day'] > merged['last_day_fitted'])
+               | (merged['rows'] != merged['history_rows']))
+    return merged[changed]
+
+
+def write_batch(conn, results, summary):
+    """Replace the forecasts of every series in `results` inside one transaction"""
+    fitted_at = datetime.now().isoformat(timespec='seconds')
+    with conn:
+        series = [(market, commodity) for market, commodity, _, _, _ in results]
+        conn.executemany("DELETE FROM predicted_prices WHERE Market = ? AND Commodity = ?", series)
+        conn.executemany("DELETE FROM forecast_intervals WHERE Market = ? AND Commodity = ?", series)
+        conn.executemany(
+            "INSERT INTO predicted_prices (ds, Market, Commodity, Predicted_Price, trend, season_yearly, season_weekly) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(ds, market, commodity, price, trend, yearly, weekly)
+             for market, commodity, rows, _, _ in results
+             for ds, price, trend, yearly, weekly in rows])
+        conn.executemany(
+            "INSERT INTO forecast_intervals VALUES (?, ?, ?, ?, ?, ?)",
+            [(market, commodity, level, lower, upper, residuals)
+             for market, commodity, _, intervals, _ in results
+             for level, lower, upper, residuals in intervals])
+        conn.executemany(
+            "INSERT OR REPLACE INTO forecast_runs VALUES (?, ?, ?, ?, ?, ?)",
+            [(market, commodity, str(np.datetime64(int(summary[(market, commodity)][0]), 'D')),
+              int(summary[(market, commodity)][1]), fitted_at, round(seconds, 4))
+             for market, commodity, _, _, seconds in results])
+
+
+def run(data_db, predictions_db, horizon, workers, full, batch_size):
+    started = time.perf_counter()
+    history = load_history(data_db)
+    print(f"Loaded {len(history)} history rows from {data_db}")
+
+    conn = sqlite3.connect(predictions_db)
+    ensure_schema(conn)
+    todo = stale_series(history, conn, full)
+    print(f"{len(todo)} series to (re)fit{' (full refresh)' if full else ''}")
+    if todo.empty:
+        conn.close()
+        return []
+
+    wanted = set(zip(todo['Market'], todo['Commodity']))
+    summary = {(m, c): (d, r) for m, c, d, r in zip(todo['Market'], todo['Commodity'], todo['last_day'], todo['rows'])}
+    tasks = [(market, commodity, group['day'].to_numpy(), group['Modal_Price'].to_numpy(dtype=np.float64), horizon)
+             for (market, commodity), group in history.groupby(['Market', 'Commodity'], sort=False)
+             if (market, commodity) in wanted]
+
+    timings = []
+    pending = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(fit_series, tasks, chunksize=max(1, len(tasks) // (workers * 8))):
+            pending.append(result)
+            timings.append((result[0], result[1], result[4]))
+            if len(pending) >= batch_size:
+                write_batch(conn, pending, summary)
+                pending = []
+    if pending:
+        write_batch(conn, pending, summary)
+    conn.close()
+
+    timings.sort(key=lambda item: -item[2])
+    print(f"\n{'Market':<25} {'Commodity':<25} {'fit ms':>8}")
+    for market, commodity, seconds in timings[:20]:
+        print(f"{market[:25]:<25} {commodity[:25]:<25} {seconds * 1000:>8.1f}")
+    total_fit = sum(t[2] for t in timings)
+    print(f"\n✓ Refitted {len(timings)} series in {time.perf_counter() - started:.1f}s "
+          f"(fit time {total_fit:.1f}s across {workers} workers)")
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh predicted_prices from market_data')
+    parser.add_argument('--data-db', default=DB_PATH)
+    parser.add_argument('--predictions-db', default=PREDICTIONS_DB_PATH)
+    parser.add_argument('--horizon', type=int, default=180, help='days to forecast past the last arrival')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=200, help='series written per transaction')
+    parser.add_argument('--full', action='store_true', help='refit every series, not just changed ones')
+    args = parser.parse_args()
+    run(args.data_db, args.predictions_db, args.horizon, args.workers, args.full, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Build-time pre-rendering for the Vercel deployment
+Runs the app's own handlers once and writes responses that only change when
+the databases change into static JSON under frontend/prerendered/, mirroring
+the /api paths that vercel.json routes to them:
+
+  /api/states, /api/kpis, ...                -> prerendered/api/states.json, ...
+  /api/market-commodities/<market>            -> prerendered/api/market-commodities/<market>.json
+  /api/prediction-commodities?market=<market> -> prerendered/api/prediction-commodities/<market>.json
+  /api/forecast-data/<commodity>?market=<m>   -> prerendered/api/forecast-data/<m>/<commodity>.json
+
+Each route rewrites to its file and continues; when the file was not rendered the
+request falls through to the Flask function, so a partial render is still correct.
+Runs on every Vercel build through the vercel-build script in package.json.
+
+Usage:  python api/prerender.py [--out frontend/prerendered]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from urllib.parse import quote
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import app as api  # noqa: E402  (loads both databases)
+
+OUT_DIR = os.path.join(os.path.dirname(__file__), '..', 'frontend', 'prerendered')
+
+# Responses with no query parameters, served for requests that carry none of the filters
+STATIC_PATHS = [
+    '/api/version', '/api/states', '/api/commodities', '/api/markets', '/api/model-commodities',
+    '/api/prediction-markets', '/api/prediction-commodities', '/api/comparison-commodities', '/api/kpis',
+]
+
+
+def safe_name(value):
+    """Names containing a path separator cannot be mirrored as files and are skipped"""
+    return value and '/' not in value and value not in ('.', '..')
+
+
+def render(client, url, out_dir, target):
+    """GET url through the Flask app and write the JSON body to out_dir/target; True on success"""
+    response = client.get(url, headers={'Accept-Encoding': 'identity'})
+    if response.status_code != 200:
+        print(f"  skipped {url}: HTTP {response.status_code}")
+        return False
+    path = os.path.join(out_dir, target)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(response.get_data())
+    return True
+
+
+def prerender(out_dir):
+    started = time.perf_counter()
+    client = api.app.test_client()
+    if os.path.isdir(out_dir):
+        shutil.rmtree(out_dir)
+
+    rendered = [path for path in STATIC_PATHS if render(client, path, out_dir, path.lstrip('/') + '.json')]
+
+    markets = [m for m in client.get('/api/markets').get_json() or [] if safe_name(m)]
+    for market in markets:
+        if render(client, f'/api/market-commodities/{quote(market, safe="")}', out_dir,
+                  f'api/market-commodities/{market}.json'):
+            rendered.append(f'/api/market-commodities/{market}')
+
+    prediction_markets = [m for m in client.get('/api/prediction-markets').get_json() or [] if safe_name(m)]
+    for market in prediction_markets:
+        if render(client, f'/api/prediction-commodities?market={quote(market)}', out_dir,
+                  f'api/prediction-commodities/{market}.json'):
+            rendered.append(f'/api/prediction-commodities?market={market}')
+
+    if not api.predictions_df.empty:
+        pairs = api.predictions_df[['Market', 'Commodity']].drop_duplicates()
+        for market, commodity in pairs.itertuples(index=False):
+            if not (safe_name(market) and safe_name(commodity)):
+                continue
+            # Full series only: requests carrying ?max_points= are downsampled by the function
+            url = f'/api/forecast-data/{quote(commodity, safe="")}?market={quote(market)}'
+            if render(client, url, out_dir, f'api/forecast-data/{market}/{commodity}.json'):
+                rendered.append(f'/api/forecast-data/{commodity}?market={market}')
+
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump({
+            'data_version': api.DATA_VERSION,
+            'predictions_version': api.PREDICTIONS_VERSION,
+            'generated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'responses': rendered
+        }, f, indent=1)
+    print(f"✓ Pre-rendered {len(rendered)} responses into {os.path.normpath(out_dir)} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-render static API responses for the Vercel deployment')
+    parser.add_argument('--out', default=OUT_DIR, help='output directory (served as /prerendered)')
+    args = parser.parse_args()
+    if api.df.empty:
+        # Don't fail the deployment: every route falls through to the function
+        print('✗ Market data not loaded; nothing to pre-render')
+        return
+    prerender(args.out)
+
+
+if __name__ == '__main__':
+    main()
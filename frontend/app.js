@@ -109,6 +109,118 @@ const dateRangeText = document.getElementById('dateRangeText');
 // Cache for market-commodity mappings
 const marketCommodities = {};
 
+// ============================================
+// PERSISTENT RESPONSE CACHE & REQUEST CANCELLATION
+// ============================================
+// Catalogue and time-series responses are kept in IndexedDB tagged with the API's
+// dataset version (/api/version). A reload costs one version check; entries of any
+// other version are dropped. Without IndexedDB everything is simply fetched.
+const CACHE_DB_NAME = 'agrimarket-cache';
+const CACHE_STORE = 'responses';
+let cacheDbPromise = null;
+let datasetVersionPromise = null;
+
+function openCacheDb() {
+    if (!cacheDbPromise) {
+        cacheDbPromise = new Promise(resolve => {
+            if (!window.indexedDB) return resolve(null);
+            const request = indexedDB.open(CACHE_DB_NAME, 1);
+            request.onupgradeneeded = () => request.result.createObjectStore(CACHE_STORE);
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(null);
+        });
+    }
+    return cacheDbPromise;
+}
+
+function cacheStoreRequest(db, mode, action) {
+    return new Promise(resolve => {
+        try {
+            const request = action(db.transaction(CACHE_STORE, mode).objectStore(CACHE_STORE));
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => resolve(undefined);
+        } catch (error) {
+            resolve(undefined);
+        }
+    });
+}
+
+// Drop cached responses that belong to any other dataset version
+async function purgeStaleCache(version) {
+    const db = await openCacheDb();
+    if (!db || !version) return;
+    const store = db.transaction(CACHE_STORE, 'readwrite').objectStore(CACHE_STORE);
+    store.openCursor().onsuccess = event => {
+        const cursor = event.target.result;
+        if (!cursor) return;
+        if (cursor.value.version !== version) cursor.delete();
+        cursor.continue();
+    };
+}
+
+function datasetVersion() {
+    if (!datasetVersionPromise) {
+        datasetVersionPromise = fetch(`${API_BASE_URL}/api/version`)
+            .then(response => response.ok ? response.json() : null)
+            .then(v => v ? `${v.data_version}:${v.predictions_version}` : null)
+            .catch(() => null);
+        datasetVersionPromise.then(purgeStaleCache);
+    }
+    return datasetVersionPromise;
+}
+
+function abortError() {
+    return new DOMException('Superseded by a newer request', 'AbortError');
+}
+
+function isAbortError(error) {
+    return error && error.name === 'AbortError';
+}
+
+// GET a JSON response through the version-tagged cache; error responses are not stored
+async function cachedJson(url, options = {}) {
+    const [version, db] = await Promise.all([datasetVersion(), openCacheDb()]);
+    if (version && db) {
+        const entry = await cacheStoreRequest(db, 'readonly', store => store.get(url));
+        if (entry && entry.version === version) {
+            if (options.signal && options.signal.aborted) throw abortError();
+            return entry.data;
+        }
+    }
+    const response = await fetch(url, options);
+    const data = await response.json();
+    if (response.ok && version && db) {
+        cacheStoreRequest(db, 'readwrite', store => store.put({ version, data }, url));
+    }
+    if (options.signal && options.signal.aborted) throw abortError();
+    return data;
+}
+
+// One in-flight request per key: starting a new one aborts the one it supersedes
+const inflightRequests = {};
+
+function latestRequest(key) {
+    if (inflightRequests[key]) inflightRequests[key].abort();
+    const controller = new AbortController();
+    inflightRequests[key] = controller;
+    return controller.signal;
+}
+
+// Warm the cache with the historical analytics series of every commodity in a market
+function prefetchMarketSeries(market, commodities) {
+    const idle = window.requestIdleCallback || (callback => setTimeout(callback, 200));
+    const queue = commodities.flatMap(commodity => [
+        candlestickUrl(commodity, market),
+        historicalCalendarUrl(commodity, market)
+    ]);
+    const next = () => {
+        // Stop once the user has moved on to another market
+        if (!queue.length || analyticsMarketSelect.value !== market) return;
+        cachedJson(queue.shift()).catch(() => {}).finally(() => idle(next));
+    };
+    idle(next);
+}
+
 // Chart Information Data
 const CHART_INFO = {
     'commodity-pie': {
@@ -766,6 +878,9 @@ function setupEventListeners() {
             if (market && commodity) {
                 loadHistoricalAnalytics(market, commodity);
             }
+            if (market) {
+                prefetchMarketSeries(market, marketCommodities[market] || []);
+            }
         });
     }
     if (analyticsCommoditySelect) {
@@ -899,21 +1014,14 @@ async function loadInitialData() {
     console.log('=== Loading Initial Data ===');
     try {
         console.log('Fetching data from backend...');
-        const [statesRes, commoditiesRes, marketsRes, modelCommoditiesRes, predictionMarketsRes] = await Promise.all([
-            fetch(`${API_BASE_URL}/api/states`),
-            fetch(`${API_BASE_URL}/api/commodities`),
-            fetch(`${API_BASE_URL}/api/markets`),
-            fetch(`${API_BASE_URL}/api/model-commodities`),
-            fetch(`${API_BASE_URL}/api/prediction-markets`)
+        [availableStates, availableCommodities, availableMarkets, modelCommodities, predictionMarkets] = await Promise.all([
+            cachedJson(`${API_BASE_URL}/api/states`),
+            cachedJson(`${API_BASE_URL}/api/commodities`),
+            cachedJson(`${API_BASE_URL}/api/markets`),
+            cachedJson(`${API_BASE_URL}/api/model-commodities`),
+            cachedJson(`${API_BASE_URL}/api/prediction-markets`)
         ]);
         
-        console.log('API responses received, parsing JSON...');
-        availableStates = await statesRes.json();
-        availableCommodities = await commoditiesRes.json();
-        availableMarkets = await marketsRes.json();
-        modelCommodities = await modelCommoditiesRes.json();
-        predictionMarkets = await predictionMarketsRes.json();
-        
         console.log('Loaded from backend:', {
             states: availableStates.length,
             commodities: availableCommodities.length,
@@ -961,8 +1069,8 @@ async function updateMarketFilterByState() {
     }
     
     try {
-        const response = await fetch(`${API_BASE_URL}/api/markets?state=${encodeURIComponent(selectedState)}`);
-        const markets = await response.json();
+        const markets = await cachedJson(`${API_BASE_URL}/api/markets?state=${encodeURIComponent(selectedState)}`,
+            { signal: latestRequest('market-filter') });
         
         // Repopulate market checkboxes
         marketCheckboxContainer.innerHTML = '';
@@ -1010,6 +1118,7 @@ async function updateMarketFilterByState() {
         // Update commodities based on new markets
         await updateCommodityFilterByMarkets();
     } catch (error) {
+        if (isAbortError(error)) return;
         console.error('Error updating market filter:', error);
         populateMarketFilter(); // Fallback
     }
@@ -1028,10 +1137,10 @@ async function updateCommodityFilterByMarkets() {
     try {
         // Fetch commodities available for selected markets
         const commoditiesSet = new Set();
+        const signal = latestRequest('commodity-filter');
         
         for (const market of selectedMarkets) {
-            const response = await fetch(`${API_BASE_URL}/api/commodities?market=${encodeURIComponent(market)}`);
-            const commodities = await response.json();
+            const commodities = await cachedJson(`${API_BASE_URL}/api/commodities?market=${encodeURIComponent(market)}`, { signal });
             commodities.forEach(c => commoditiesSet.add(c));
         }
         
@@ -1347,6 +1456,93 @@ function populateAnalyticsMarketDropdown() {
     console.log('=== Finished populateAnalyticsMarketDropdown ===\n');
 }
 
+// Point budget for a chart: about two points per rendered pixel, so the server
+// can downsample long series without any visible loss
+function chartMaxPoints(chartId) {
+    const el = document.getElementById(chartId);
+    const width = el && el.clientWidth ? el.clientWidth : window.innerWidth;
+    return Math.max(200, Math.round(width * 2));
+}
+
+// Analytic endpoints can answer with an Arrow IPC stream instead of JSON. We ask for
+// Arrow and only download the decoder the first time the server actually sends it, then
+// convert the columns back into the JSON shape the renderers already expect. Servers
+// without pyarrow reply with JSON, which is used as-is and never loads the decoder.
+const ARROW_MIME = 'application/vnd.apache.arrow.stream';
+const ARROW_DECODER_URL = 'https://cdn.jsdelivr.net/npm/apache-arrow@17.0.0/Arrow.es2015.min.js';
+let arrowDecoder = null;
+let arrowUnavailable = false;
+
+function loadArrowDecoder() {
+    if (!arrowDecoder) {
+        arrowDecoder = new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = ARROW_DECODER_URL;
+            script.onload = () => resolve(window.Arrow);
+            script.onerror = () => reject(new Error('Arrow decoder failed to load'));
+            document.head.appendChild(script);
+        });
+    }
+    return arrowDecoder;
+}
+
+async function fetchAnalytic(url, fromArrow, signal) {
+    const headers = arrowUnavailable ? {} : { Accept: `${ARROW_MIME}, application/json;q=0.5` };
+    const response = await fetch(url, { signal, headers });
+    if ((response.headers.get('Content-Type') || '').startsWith(ARROW_MIME)) {
+        const body = await response.arrayBuffer();
+        try {
+            const Arrow = await loadArrowDecoder();
+            return fromArrow(Arrow.tableFromIPC(body));
+        } catch (error) {
+            // Decoder unreachable: stop asking for Arrow and fetch the JSON body instead
+            console.error('Falling back to JSON:', error);
+            arrowUnavailable = true;
+            return (await fetch(url, { signal })).json();
+        }
+    }
+    return response.json();
+}
+
+// Split a grouped key column into [key, start, end) runs
+function arrowRuns(table, name) {
+    const keys = table.getChild(name).toArray();
+    const runs = [];
+    for (let i = 0; i < keys.length; i++) {
+        if (i === 0 || keys[i] !== keys[i - 1]) runs.push([keys[i], i, i + 1]);
+        else runs[runs.length - 1][2] = i + 1;
+    }
+    return runs;
+}
+
+function priceDistributionFromArrow(table) {
+    const prices = table.getChild('price').toArray();
+    return { commodities: arrowRuns(table, 'commodity').map(([name, start, end]) => ({ name, prices: prices.subarray(start, end) })) };
+}
+
+function volatilityHeatmapFromArrow(table) {
+    const markets = arrowRuns(table, 'market').map(([market]) => market);
+    const commodities = Array.from(new Set(table.getChild('commodity').toArray()));
+    const values = table.getChild('volatility').toArray();
+    const volatility = markets.map((_, i) => Array.from(values.subarray(i * commodities.length, (i + 1) * commodities.length)));
+    return { markets, commodities, volatility };
+}
+
+function commodityComparisonFromArrow(table) {
+    const dates = table.getChild('date');
+    const prices = table.getChild('price').toArray();
+    return {
+        commodities: arrowRuns(table, 'commodity').map(([name, start, end]) => {
+            const data = [];
+            for (let i = start; i < end; i++) {
+                // date32 decodes to epoch milliseconds (or a Date in older Arrow builds)
+                data.push({ date: new Date(dates.get(i)).toISOString().slice(0, 7), price: prices[i] });
+            }
+            return { name, data };
+        })
+    };
+}
+
 // Build filter query string
 function buildFilterQuery() {
     const params = new URLSearchParams();
@@ -1387,12 +1583,13 @@ async function loadData() {
             const filterQuery = buildFilterQuery();
             const queryString = filterQuery ? `?${filterQuery}` : '';
             
-            // Fetch from backend with filters
+            // Fetch from backend with filters; a newer filter change aborts these
+            const signal = latestRequest('dashboard');
             const [kpis, countData, yearData, priceData] = await Promise.all([
-                fetch(`${API_BASE_URL}/api/kpis${queryString}`).then(r => r.json()),
-                fetch(`${API_BASE_URL}/api/commodities-by-count${queryString}`).then(r => r.json()),
-                fetch(`${API_BASE_URL}/api/price-by-year${queryString}`).then(r => r.json()),
-                fetch(`${API_BASE_URL}/api/commodities-by-price${queryString}`).then(r => r.json())
+                fetch(`${API_BASE_URL}/api/kpis${queryString}`, { signal }).then(r => r.json()),
+                fetch(`${API_BASE_URL}/api/commodities-by-count${queryString}`, { signal }).then(r => r.json()),
+                fetch(`${API_BASE_URL}/api/price-by-year${queryString}`, { signal }).then(r => r.json()),
+                fetch(`${API_BASE_URL}/api/commodities-by-price${queryString}`, { signal }).then(r => r.json())
             ]);
             
             updateKPIs(kpis);
@@ -1400,6 +1597,7 @@ async function loadData() {
             renderLineChart(yearData);
             renderBarChart(priceData);
         } catch (error) {
+            if (isAbortError(error)) return;
             console.error('Error loading data:', error);
             // Fallback to mock data
             updateKPIs(MOCK_DATA.kpis);
@@ -1590,14 +1788,16 @@ async function loadForecastData() {
         updatePrediction();
     } else {
         try {
-            const response = await fetch(`${API_BASE_URL}/api/forecast-data/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}`);
-            const data = await response.json();
+            // No max_points: forecast series are short, and the unbudgeted URL is served pre-rendered
+            const data = await cachedJson(`${API_BASE_URL}/api/forecast-data/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}`,
+                { signal: latestRequest('forecastChart') });
             renderForecastChart({
                 historical: data.historicalData,
                 predicted: data.forecastData
             });
             updatePrediction();
         } catch (error) {
+            if (isAbortError(error)) return;
             console.error('Error loading forecast data:', error);
             renderForecastChart(MOCK_DATA.forecast);
         }
@@ -1867,22 +2067,16 @@ async function showPriceDetail() {
     modal.classList.add('active');
     
     try {
-        const filterQuery = buildFilterQuery();
-        const queryString = filterQuery ? `?${filterQuery}` : '';
-        const response = await fetch(`${API_BASE_URL}/api/price-details${queryString}`);
-        const data = await response.json();
+        const page = await fetchPriceDetailPage(null);
         
-        if (data && data.length > 0) {
+        if (page.data && page.data.length > 0) {
             content.innerHTML = `
-                <div class="detail-grid">
-                    ${data.slice(0, 20).map(item => `
-                        <div class="detail-item">
-                            <div class="detail-item-title">${item.commodity} - ${item.market}</div>
-                            <div class="detail-item-value">₹${item.avg_price.toFixed(2)}</div>
-                        </div>
-                    `).join('')}
+                <div class="detail-grid" id="priceDetailGrid"></div>
+                <div style="text-align: center; margin-top: 16px;">
+                    <button class="btn btn-secondary" id="priceDetailMore" style="display: none;">Show more</button>
                 </div>
             `;
+            appendPriceDetailPage(page);
         } else {
             content.innerHTML = '<div style="text-align: center; padding: 40px; color: var(--text-secondary);">No price data available</div>';
         }
@@ -1892,6 +2086,42 @@ async function showPriceDetail() {
     }
 }
 
+const PRICE_DETAIL_PAGE_SIZE = 20;
+
+// Fetch one page of price details; the cursor comes from the previous page
+async function fetchPriceDetailPage(cursor) {
+    const params = new URLSearchParams(buildFilterQuery());
+    params.append('limit', PRICE_DETAIL_PAGE_SIZE);
+    if (cursor) params.append('cursor', cursor);
+    const response = await fetch(`${API_BASE_URL}/api/price-details?${params.toString()}`);
+    return response.json();
+}
+
+function appendPriceDetailPage(page) {
+    const grid = document.getElementById('priceDetailGrid');
+    const more = document.getElementById('priceDetailMore');
+    if (!grid || !more) return;
+    
+    grid.insertAdjacentHTML('beforeend', page.data.map(item => `
+        <div class="detail-item">
+            <div class="detail-item-title">${item.commodity} - ${item.market}</div>
+            <div class="detail-item-value">₹${item.avg_price.toFixed(2)}</div>
+        </div>
+    `).join(''));
+    
+    more.style.display = page.next_cursor ? 'inline-block' : 'none';
+    more.onclick = async () => {
+        more.disabled = true;
+        try {
+            appendPriceDetailPage(await fetchPriceDetailPage(page.next_cursor));
+        } catch (error) {
+            console.error('Error loading more price details:', error);
+        } finally {
+            more.disabled = false;
+        }
+    };
+}
+
 async function showCommoditiesDetail() {
     const modal = document.getElementById('commoditiesDetailModal');
     const content = document.getElementById('commoditiesDetailContent');
@@ -1917,8 +2147,7 @@ async function showCommoditiesDetail() {
 // Dynamic Commodity Filtering Based on Market
 async function fetchCommoditiesForMarket(market) {
     try {
-        const response = await fetch(`${API_BASE_URL}/api/market-commodities/${encodeURIComponent(market)}`);
-        const data = await response.json();
+        const data = await cachedJson(`${API_BASE_URL}/api/market-commodities/${encodeURIComponent(market)}`);
         return data.commodities || [];
     } catch (error) {
         console.error(`Error fetching commodities for market ${market}:`, error);
@@ -2064,19 +2293,26 @@ async function loadAdvancedAnalytics(commodity) {
     ]);
 }
 
+function candlestickUrl(commodity, market) {
+    return `${API_BASE_URL}/api/candlestick-data/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}&max_points=${chartMaxPoints('candlestickChart')}`;
+}
+
+function historicalCalendarUrl(commodity, market) {
+    return `${API_BASE_URL}/api/historical-calendar/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}&max_points=${chartMaxPoints('historicalCalendarChart')}`;
+}
+
 // 1. Candlestick Chart (Historical Price Volatility)
 async function loadCandlestickChart(commodity, market = 'Udumalpet') {
     try {
-        const response = await fetch(`${API_BASE_URL}/api/candlestick-data/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}`);
-        const result = await response.json();
+        const result = await cachedJson(candlestickUrl(commodity, market), { signal: latestRequest('candlestickChart') });
         
         if (result.data && result.data.length > 0) {
             const trace = {
                 x: result.data.map(d => d.date),
-                close: result.data.map(d => d.modal),
+                close: result.data.map(d => d.close ?? d.modal),
                 high: result.data.map(d => d.max),
                 low: result.data.map(d => d.min),
-                open: result.data.map(d => d.modal),
+                open: result.data.map(d => d.open ?? d.modal),
                 type: 'candlestick',
                 name: 'Price',
                 increasing: { line: { color: '#10b981' } },
@@ -2110,6 +2346,7 @@ async function loadCandlestickChart(commodity, market = 'Udumalpet') {
             document.getElementById('candlestickChart').innerHTML = '<div style="text-align: center; padding: 40px; color: var(--text-secondary);">No data available</div>';
         }
     } catch (error) {
+        if (isAbortError(error)) return;
         console.error('Error loading candlestick chart:', error);
         document.getElementById('candlestickChart').innerHTML = '<div style="text-align: center; padding: 40px; color: #ef4444;">Error loading chart</div>';
     }
@@ -2118,8 +2355,7 @@ async function loadCandlestickChart(commodity, market = 'Udumalpet') {
 // 2. Historical Calendar Heatmap
 async function loadHistoricalCalendar(commodity, market = 'Udumalpet') {
     try {
-        const response = await fetch(`${API_BASE_URL}/api/historical-calendar/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}`);
-        const result = await response.json();
+        const result = await cachedJson(historicalCalendarUrl(commodity, market), { signal: latestRequest('historicalCalendarChart') });
         
         if (result.data && result.data.length > 0) {
             const dates = result.data.map(d => d.date);
@@ -2166,6 +2402,7 @@ async function loadHistoricalCalendar(commodity, market = 'Udumalpet') {
             document.getElementById('historicalCalendarChart').innerHTML = '<div style="text-align: center; padding: 40px; color: var(--text-secondary);">No data available</div>';
         }
     } catch (error) {
+        if (isAbortError(error)) return;
         console.error('Error loading historical calendar:', error);
         document.getElementById('historicalCalendarChart').innerHTML = '<div style="text-align: center; padding: 40px; color: #ef4444;">Error loading chart</div>';
     }
@@ -2176,8 +2413,8 @@ async function loadSeasonalityChart(commodity) {
     const forecastMarketElem = document.getElementById('forecastMarket');
     const market = forecastMarketElem ? forecastMarketElem.value : 'Udumalpet';
     try {
-        const response = await fetch(`${API_BASE_URL}/api/seasonality-decomposition/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}`);
-        const result = await response.json();
+        const result = await cachedJson(`${API_BASE_URL}/api/seasonality-decomposition/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}`,
+            { signal: latestRequest('seasonalityChart') });
         
         if (result.data && result.data.length > 0) {
             const dates = result.data.map(d => d.date);
@@ -2244,6 +2481,7 @@ async function loadSeasonalityChart(commodity) {
             document.getElementById('seasonalityChart').innerHTML = '<div style="text-align: center; padding: 40px; color: var(--text-secondary);">No prediction data available</div>';
         }
     } catch (error) {
+        if (isAbortError(error)) return;
         console.error('Error loading seasonality chart:', error);
         document.getElementById('seasonalityChart').innerHTML = '<div style="text-align: center; padding: 40px; color: #ef4444;">Error loading chart</div>';
     }
@@ -2254,8 +2492,8 @@ async function loadUncertaintyChart(commodity) {
     const forecastMarketElem = document.getElementById('forecastMarket');
     const market = forecastMarketElem ? forecastMarketElem.value : 'Udumalpet';
     try {
-        const response = await fetch(`${API_BASE_URL}/api/forecast-uncertainty/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}`);
-        const result = await response.json();
+        const result = await cachedJson(`${API_BASE_URL}/api/forecast-uncertainty/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}`,
+            { signal: latestRequest('uncertaintyChart') });
         
         if (result.data && result.data.length > 0) {
             const dates = result.data.map(d => d.date);
@@ -2322,6 +2560,7 @@ async function loadUncertaintyChart(commodity) {
             document.getElementById('uncertaintyChart').innerHTML = '<div style="text-align: center; padding: 40px; color: var(--text-secondary);">No prediction data available</div>';
         }
     } catch (error) {
+        if (isAbortError(error)) return;
         console.error('Error loading uncertainty chart:', error);
         document.getElementById('uncertaintyChart').innerHTML = '<div style="text-align: center; padding: 40px; color: #ef4444;">Error loading chart</div>';
     }
@@ -2332,8 +2571,8 @@ async function loadForecastCalendar(commodity) {
     const forecastMarketElem = document.getElementById('forecastMarket');
     const market = forecastMarketElem ? forecastMarketElem.value : 'Udumalpet';
     try {
-        const response = await fetch(`${API_BASE_URL}/api/forecast-calendar/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}`);
-        const result = await response.json();
+        const result = await cachedJson(`${API_BASE_URL}/api/forecast-calendar/${encodeURIComponent(commodity)}?market=${encodeURIComponent(market)}`,
+            { signal: latestRequest('forecastCalendarChart') });
         
         if (result.data && result.data.length > 0) {
             const dates = result.data.map(d => d.date);
@@ -2381,6 +2620,7 @@ async function loadForecastCalendar(commodity) {
             document.getElementById('forecastCalendarChart').innerHTML = '<div style="text-align: center; padding: 40px; color: var(--text-secondary);">No prediction data available</div>';
         }
     } catch (error) {
+        if (isAbortError(error)) return;
         console.error('Error loading forecast calendar:', error);
         document.getElementById('forecastCalendarChart').innerHTML = '<div style="text-align: center; padding: 40px; color: #ef4444;">Error loading chart</div>';
     }
@@ -2778,7 +3018,8 @@ async function renderYoYComparisonChart() {
         // Use selected commodity or default to Onion
         const commodity = historicalFilters.commodity || 'Onion';
         
-        const response = await fetch(`${API_BASE_URL}/api/year-over-year/${encodeURIComponent(commodity)}?${queryParams}`);
+        const response = await fetch(`${API_BASE_URL}/api/year-over-year/${encodeURIComponent(commodity)}?${queryParams}`,
+            { signal: latestRequest('yoyComparisonChart') });
         const data = await response.json();
         
         if (data && data.years && data.years.length > 0) {
@@ -2821,6 +3062,7 @@ async function renderYoYComparisonChart() {
             document.getElementById('yoyComparisonChart').innerHTML = '<div style="text-align: center; padding: 40px; color: var(--text-secondary);">No data available for year-over-year comparison</div>';
         }
     } catch (error) {
+        if (isAbortError(error)) return;
         console.error('Error rendering YoY chart:', error);
         document.getElementById('yoyComparisonChart').innerHTML = '<div style="text-align: center; padding: 40px; color: #ef4444;">Error loading chart</div>';
     }
@@ -2830,8 +3072,8 @@ async function renderYoYComparisonChart() {
 async function renderVolatilityHeatmap() {
     try {
         const queryParams = buildHistoricalFilterQuery();
-        const response = await fetch(`${API_BASE_URL}/api/volatility-heatmap?${queryParams}`);
-        const data = await response.json();
+        const data = await fetchAnalytic(`${API_BASE_URL}/api/volatility-heatmap?${queryParams}`, volatilityHeatmapFromArrow,
+            latestRequest('volatilityHeatmapChart'));
         
         if (data && data.commodities && data.markets && data.volatility) {
             const trace = {
@@ -2873,6 +3115,7 @@ async function renderVolatilityHeatmap() {
             document.getElementById('volatilityHeatmapChart').innerHTML = '<div style="text-align: center; padding: 40px; color: var(--text-secondary);">No volatility data available</div>';
         }
     } catch (error) {
+        if (isAbortError(error)) return;
         console.error('Error rendering volatility heatmap:', error);
         document.getElementById('volatilityHeatmapChart').innerHTML = '<div style="text-align: center; padding: 40px; color: #ef4444;">Error loading chart</div>';
     }
@@ -2900,7 +3143,7 @@ async function renderSeasonalRadarChart() {
         
         const url = `${API_BASE_URL}/api/seasonal-pattern/${encodeURIComponent(firstCommodity)}?commodities=${encodeURIComponent(commoditiesParam)}&${queryParams}`;
         
-        const response = await fetch(url);
+        const response = await fetch(url, { signal: latestRequest('seasonalRadarChart') });
         const data = await response.json();
         
         const monthNames = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
@@ -2965,6 +3208,7 @@ async function renderSeasonalRadarChart() {
             document.getElementById('seasonalRadarChart').innerHTML = '<div style="text-align: center; padding: 40px; color: var(--text-secondary);">No seasonal data available</div>';
         }
     } catch (error) {
+        if (isAbortError(error)) return;
         console.error('Error rendering seasonal radar:', error);
         document.getElementById('seasonalRadarChart').innerHTML = '<div style="text-align: center; padding: 40px; color: #ef4444;">Error loading chart</div>';
     }
@@ -2984,8 +3228,8 @@ async function renderViolinPlot() {
             commoditiesParam = defaultCommodities.join(',');
         }
         
-        const response = await fetch(`${API_BASE_URL}/api/price-distribution?commodities=${encodeURIComponent(commoditiesParam)}&${queryParams}`);
-        const data = await response.json();
+        const data = await fetchAnalytic(`${API_BASE_URL}/api/price-distribution?commodities=${encodeURIComponent(commoditiesParam)}&${queryParams}`, priceDistributionFromArrow,
+            latestRequest('violinPlotChart'));
         
         if (data && data.commodities && data.commodities.length > 0) {
             const traces = data.commodities.map(item => ({
@@ -3024,6 +3268,7 @@ async function renderViolinPlot() {
             document.getElementById('violinPlotChart').innerHTML = '<div style="text-align: center; padding: 40px; color: var(--text-secondary);">No distribution data available</div>';
         }
     } catch (error) {
+        if (isAbortError(error)) return;
         console.error('Error rendering violin plot:', error);
         document.getElementById('violinPlotChart').innerHTML = '<div style="text-align: center; padding: 40px; color: #ef4444;">Error loading chart</div>';
     }
@@ -3160,10 +3405,11 @@ async function renderMultiCommodityComparison() {
         const endDate = document.getElementById('comparisonEndDate')?.value;
         if (startDate) params.append('start_date', startDate);
         if (endDate) params.append('end_date', endDate);
+        params.append('max_points', chartMaxPoints('multiCommodityChart'));
         
         const commoditiesParam = selected.join(',');
-        const response = await fetch(`${API_BASE_URL}/api/multi-commodity-comparison?commodities=${encodeURIComponent(commoditiesParam)}&${params.toString()}`);
-        const data = await response.json();
+        const data = await fetchAnalytic(`${API_BASE_URL}/api/multi-commodity-comparison?commodities=${encodeURIComponent(commoditiesParam)}&${params.toString()}`, commodityComparisonFromArrow,
+            latestRequest('multiCommodityChart'));
         
         if (data && data.commodities && data.commodities.length > 0) {
             const colors = getThemeColors();
@@ -3207,6 +3453,7 @@ async function renderMultiCommodityComparison() {
             document.getElementById('multiCommodityChart').innerHTML = '<div style="text-align: center; padding: 40px; color: var(--text-secondary);">No comparison data available</div>';
         }
     } catch (error) {
+        if (isAbortError(error)) return;
         console.error('Error rendering multi-commodity comparison:', error);
         document.getElementById('multiCommodityChart').innerHTML = '<div style="text-align: center; padding: 40px; color: #ef4444;">Error loading chart</div>';
     }